@@ -0,0 +1,66 @@
+"""
+Thin HTTP client for ``src.api.server``.
+
+Exposes the subset of ``RAGPipeline`` / ``IngestionWorker`` used by the
+Streamlit app so it can run without a local model or upstream clients.
+"""
+
+import os
+import requests
+
+
+class RAGServiceClient:
+    def __init__(self, base_url=None, timeout=None):
+        self.base_url = (base_url or os.getenv("RAG_SERVICE_URL", "http://127.0.0.1:8080")).rstrip("/")
+        self.timeout = timeout or float(os.getenv("RAG_SERVICE_TIMEOUT", "120"))
+        self.session = requests.Session()
+        print(f"✅ RAGServiceClient using {self.base_url}")
+
+    # ------------------------------------------------------------------
+    def _request(self, method, path, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        resp = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+        resp.raise_for_status()
+        return resp
+
+    def health(self):
+        return self._request("GET", "/healthz").json()
+
+    # ------------------------------------------------------------------
+    def query(self, query_text, k=4, sources=None):
+        """Answer a question; mirrors ``RAGPipeline.query``."""
+        try:
+            body = {"query": query_text, "k": k, "sources": list(sources or [])}
+            return self._request("POST", "/query", json=body).json()["answer"]
+        except requests.RequestException as e:
+            print(f"❌ Error calling RAG service: {e}")
+            return "Query processing failed."
+
+    def query_stream(self, query_text, k=4, sources=None):
+        """Yield the answer in pieces as the service streams it."""
+        body = {"query": query_text, "k": k, "sources": list(sources or [])}
+        try:
+            with self._request("POST", "/query/stream", json=body, stream=True) as resp:
+                for piece in resp.iter_content(chunk_size=None, decode_unicode=True):
+                    if piece:
+                        yield piece
+        except requests.RequestException as e:
+            print(f"❌ Error calling RAG service: {e}")
+            yield "Query processing failed."
+
+    # ------------------------------------------------------------------
+    def submit(self, url, mode="scrape"):
+        """Queue ``url`` for ingestion on the service and return the job id."""
+        return self._request("POST", "/ingest", json={"url": url, "mode": mode}).json()["id"]
+
+    def get(self, job_id):
+        """Return the job snapshot dict, or None if the service doesn't know it."""
+        try:
+            return self._request("GET", f"/jobs/{job_id}").json()
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return None
+            raise
+
+    def cancel(self, job_id):
+        return self._request("DELETE", f"/jobs/{job_id}").json()["cancelled"]
@@ -0,0 +1,228 @@
+"""
+Headless asyncio HTTP service around a single shared ``RAGPipeline``.
+
+Endpoints:
+    GET    /healthz             liveness and warm-up state
+    POST   /ingest              {"url", "mode"} -> 202 with the job snapshot
+    GET    /jobs                all known ingestion jobs
+    GET    /jobs/{job_id}       job status and progress
+    DELETE /jobs/{job_id}       cancel a job
+    POST   /query               {"query", "k", "sources", "deadline_s"} -> {"answer"}
+    POST   /query/stream        same body, answer streamed as plain text
+    GET    /metrics             per-stage latency and startup timings
+
+Blocking pipeline calls run on a bounded thread pool (``RAG_API_QUERY_WORKERS``);
+once ``RAG_API_MAX_PENDING`` queries are in flight new ones get a 503 with
+``Retry-After`` so a load balancer can route elsewhere. Ingestion jobs live
+in memory on the instance that accepted them.
+
+Run with:
+    python -m src.api.server --host 0.0.0.0 --port 8080
+"""
+
+import argparse
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+from src.rag_pipeline import RAGPipeline
+from src.utils.metrics import stage_metrics
+from src.workers.ingestion_worker import IngestionWorker
+
+
+_END = object()
+
+
+class RAGService:
+    """Owns the shared pipeline, the query thread pool and the ingestion worker."""
+
+    def __init__(self, pipeline=None, query_workers=None, ingest_workers=None, max_pending=None):
+        self.pipeline = pipeline or RAGPipeline(warmup="background")
+        self.query_workers = query_workers or int(os.getenv("RAG_API_QUERY_WORKERS", str(os.cpu_count() or 4)))
+        self.max_pending = max_pending or int(os.getenv("RAG_API_MAX_PENDING", str(self.query_workers * 8)))
+        self.executor = ThreadPoolExecutor(max_workers=self.query_workers, thread_name_prefix="rag-query")
+        self.ingestion = IngestionWorker(max_workers=ingest_workers)
+        self._pending = 0
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    async def _json_body(request):
+        try:
+            body = await request.json()
+        except Exception:
+            raise web.HTTPBadRequest(text="Request body must be JSON.")
+        if not isinstance(body, dict):
+            raise web.HTTPBadRequest(text="Request body must be a JSON object.")
+        return body
+
+    @staticmethod
+    def _query_args(body):
+        query_text = body.get("query") or ""
+        if not isinstance(query_text, str):
+            raise web.HTTPBadRequest(text="'query' must be a string.")
+        query_text = query_text.strip()
+        if not query_text:
+            raise web.HTTPBadRequest(text="'query' is required.")
+        try:
+            k = int(body.get("k", 4))
+            deadline_s = body.get("deadline_s")
+            deadline_s = float(deadline_s) if deadline_s is not None else None
+        except (TypeError, ValueError):
+            raise web.HTTPBadRequest(text="'k' must be an integer and 'deadline_s' a number.")
+        if k < 1:
+            raise web.HTTPBadRequest(text="'k' must be at least 1.")
+        if deadline_s is not None and deadline_s <= 0:
+            raise web.HTTPBadRequest(text="'deadline_s' must be positive.")
+        sources = body.get("sources") or None
+        if sources is not None and (
+            not isinstance(sources, list) or not all(isinstance(source, str) for source in sources)
+        ):
+            raise web.HTTPBadRequest(text="'sources' must be a list of URLs.")
+        return query_text, k, sources, deadline_s
+
+    def _admit(self):
+        if self._pending >= self.max_pending:
+            raise web.HTTPServiceUnavailable(text="Too many pending queries.", headers={"Retry-After": "1"})
+        self._pending += 1
+
+    # ------------------------------------------------------------------
+    async def healthz(self, request):
+        thread = self.pipeline._warmup_thread
+        return web.json_response({
+            "status": "ok",
+            "warming_up": bool(thread and thread.is_alive()),
+            "pending_queries": self._pending,
+        })
+
+    async def ingest(self, request):
+        body = await self._json_body(request)
+        url = body.get("url") or ""
+        mode = body.get("mode", "scrape")
+        if not isinstance(url, str) or not url.strip():
+            raise web.HTTPBadRequest(text="'url' is required.")
+        if mode not in ("scrape", "crawl"):
+            raise web.HTTPBadRequest(text="'mode' must be 'scrape' or 'crawl'.")
+        job_id = self.ingestion.submit(self.pipeline, url.strip(), mode=mode)
+        return web.json_response(self.ingestion.get(job_id), status=202)
+
+    async def list_jobs(self, request):
+        return web.json_response({"jobs": self.ingestion.list_jobs()})
+
+    async def get_job(self, request):
+        job = self.ingestion.get(request.match_info["job_id"])
+        if job is None:
+            raise web.HTTPNotFound(text="Unknown job.")
+        return web.json_response(job)
+
+    async def cancel_job(self, request):
+        job_id = request.match_info["job_id"]
+        if self.ingestion.get(job_id) is None:
+            raise web.HTTPNotFound(text="Unknown job.")
+        cancelled = self.ingestion.cancel(job_id)
+        return web.json_response({"cancelled": cancelled, "job": self.ingestion.get(job_id)})
+
+    async def query(self, request):
+        query_text, k, sources, deadline_s = self._query_args(await self._json_body(request))
+        self._admit()
+        try:
+            loop = asyncio.get_running_loop()
+            answer = await loop.run_in_executor(
+                self.executor, lambda: self.pipeline.query(query_text, k=k, sources=sources, deadline_s=deadline_s)
+            )
+        finally:
+            self._pending -= 1
+        return web.json_response({"answer": answer})
+
+    async def query_stream(self, request):
+        query_text, k, sources, deadline_s = self._query_args(await self._json_body(request))
+        self._admit()
+        try:
+            response = web.StreamResponse(headers={"Content-Type": "text/plain; charset=utf-8"})
+            await response.prepare(request)
+
+            loop = asyncio.get_running_loop()
+            queue = asyncio.Queue()
+            disconnected = threading.Event()
+
+            def produce():
+                try:
+                    for piece in self.pipeline.query_stream(
+                        query_text, k=k, sources=sources, deadline_s=deadline_s
+                    ):
+                        if disconnected.is_set():
+                            break
+                        loop.call_soon_threadsafe(queue.put_nowait, piece)
+                except Exception as e:
+                    print(f"❌ Error streaming answer: {e}")
+                    loop.call_soon_threadsafe(queue.put_nowait, "Query processing failed.")
+                finally:
+                    loop.call_soon_threadsafe(queue.put_nowait, _END)
+
+            producer = loop.run_in_executor(self.executor, produce)
+            try:
+                while True:
+                    piece = await queue.get()
+                    if piece is _END:
+                        break
+                    await response.write(piece.encode("utf-8"))
+            except (ConnectionResetError, asyncio.CancelledError):
+                disconnected.set()
+                raise
+            await producer
+            await response.write_eof()
+            return response
+        finally:
+            self._pending -= 1
+
+    async def metrics(self, request):
+        return web.json_response({
+            "stages": stage_metrics.snapshot(),
+            "startup": self.pipeline.startup_timings,
+            "chunking": self.pipeline.chunking_stats(),
+            "vectors": self.pipeline.document_store.ledger_stats(self.pipeline.db.index_name),
+            "coalescing": self.pipeline.coalescing_stats(),
+            "embedding_batches": self.pipeline.embedding_batch_stats(),
+            "rate_limits": self.pipeline.rate_limit_stats(),
+            "pending_queries": self._pending,
+        })
+
+    # ------------------------------------------------------------------
+    async def close(self, app):
+        self.ingestion.shutdown()
+        self.executor.shutdown(wait=False)
+
+
+def create_app(service=None):
+    """Build the aiohttp application around ``service`` (a new ``RAGService`` by default)."""
+    service = service or RAGService()
+    app = web.Application()
+    app["service"] = service
+    app.router.add_get("/healthz", service.healthz)
+    app.router.add_post("/ingest", service.ingest)
+    app.router.add_get("/jobs", service.list_jobs)
+    app.router.add_get("/jobs/{job_id}", service.get_job)
+    app.router.add_delete("/jobs/{job_id}", service.cancel_job)
+    app.router.add_post("/query", service.query)
+    app.router.add_post("/query/stream", service.query_stream)
+    app.router.add_get("/metrics", service.metrics)
+    app.on_cleanup.append(service.close)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the RAG query/ingest HTTP service.")
+    parser.add_argument("--host", default=os.getenv("RAG_API_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("RAG_API_PORT", "8080")))
+    parser.add_argument("--index-name", default=os.getenv("PINECONE_INDEX_NAME"))
+    parser.add_argument("--namespace", default=os.getenv("PINECONE_NAMESPACE"))
+    args = parser.parse_args()
+
+    pipeline = RAGPipeline(index_name=args.index_name, namespace=args.namespace, warmup="background")
+    web.run_app(create_app(RAGService(pipeline)), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+The "active" index target: which Pinecone index, namespace, embedding model
+and chunking settings new pipelines should use. Written by
+``src.database.corpus_migrate`` when it switches over to a migrated index.
+"""
+
+import json
+import os
+import time
+
+
+def active_index_path():
+    state_dir = os.getenv("RAG_STATE_DIR", ".rag_state")
+    return os.getenv("RAG_ACTIVE_INDEX_PATH", os.path.join(state_dir, "active_index.json"))
+
+
+def load_active_index():
+    """Return the active target dict, or ``{}`` if none has been set."""
+    try:
+        with open(active_index_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_active_index(index_name, namespace, model=None, chunking=None):
+    """Atomically record a new active target."""
+    path = active_index_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    target = {
+        "index_name": index_name,
+        "namespace": namespace,
+        "model": model,
+        "chunking": chunking or {},
+        "switched_at": time.time(),
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(target, f, indent=2)
+    os.replace(tmp_path, path)
+    return target
@@ -0,0 +1,151 @@
+"""
+Re-chunk and re-embed the local corpus into a new Pinecone index/namespace.
+
+Reads documents (or, with ``--reuse-chunks``, the stored chunks) from the
+``CorpusStore``, embeds them locally in large batches with the target model
+and upserts them under the same compact IDs and metadata the pipeline uses,
+recording them in the target index's chunk ledger for ``VectorGC``. With
+``--switch`` the new index becomes the active target that new
+``RAGPipeline`` instances pick up, so a model or chunking change never needs
+a re-crawl.
+
+Example:
+    python -m src.database.corpus_migrate --index pavan-mpnet --namespace default \
+        --model sentence-transformers/all-mpnet-base-v2 --chunk-tokens 256 --switch
+"""
+
+import argparse
+import os
+import time
+
+from langchain_core.documents import Document
+
+from src.database.active_index import load_active_index, save_active_index
+from src.database.corpus_store import CorpusStore
+from src.database.document_store import DocumentStore
+from src.database.pinecone_db import PineconeDatabase
+from src.rag_pipeline import namespace_for_source
+
+
+def _chunk_records(corpus, source_id, splitter):
+    """Yield ``(vector_id, text, metadata)`` for one source."""
+    if splitter is None:
+        for chunk in corpus.iter_chunks(source_id):
+            metadata = {"doc_id": chunk["doc_id"], "source_id": source_id, "chunk": chunk["chunk"]}
+            yield f"{chunk['doc_id']}:{chunk['chunk']}", chunk["text"], metadata
+        return
+
+    for record in corpus.iter_documents(source_id):
+        document = Document(page_content=record["text"],
+                            metadata={"doc_id": record["doc_id"], "source_id": source_id})
+        for ordinal, chunk in enumerate(splitter.split_documents([document])):
+            metadata = {**chunk.metadata, "chunk": ordinal}
+            yield f"{record['doc_id']}:{ordinal}", chunk.page_content, metadata
+
+
+def migrate(index_name, namespace, model_name=None, sources=None, reuse_chunks=False,
+            chunking=None, batch_size=256, switch=False):
+    """
+    Re-embed the corpus into ``index_name``/``namespace``.
+
+    Returns a summary dict with vector counts and timings.
+    """
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    from src.processors.text_chunker import TokenAwareTextSplitter
+
+    model_name = model_name or load_active_index().get("model") or os.getenv(
+        "HUGGINGFACE_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2"
+    )
+    chunking = chunking or {}
+    corpus = CorpusStore()
+    sources = sources or sorted(corpus.sources())
+    print(f"🚚 Migrating {len(sources)} sources to '{index_name}/{namespace}' with {model_name}")
+
+    embedder = HuggingFaceEmbeddings(model_name=model_name)
+    dimension = len(embedder.embed_query("dimension probe"))
+    db = PineconeDatabase(index_name=index_name, namespace=namespace)
+    vector_store = db.create_vector_store(embedder, dimension=dimension)
+    if not vector_store:
+        raise RuntimeError(f"❌ Could not open target index '{index_name}'.")
+
+    splitter = None
+    if not reuse_chunks:
+        splitter = TokenAwareTextSplitter(embedder.client.tokenizer, embedder.client.max_seq_length, **chunking)
+
+    document_store = DocumentStore()
+    routing = os.getenv("RAG_SOURCE_ROUTING", "filter")
+    start, total = time.perf_counter(), 0
+    for source_id in sources:
+        target_namespace = namespace_for_source(namespace, source_id, routing)
+        ids, texts, metadatas, chunk_counts = [], [], [], {}
+        for vector_id, text, metadata in _chunk_records(corpus, source_id, splitter):
+            chunk_counts[metadata["doc_id"]] = max(chunk_counts.get(metadata["doc_id"], 0), metadata["chunk"] + 1)
+            ids.append(vector_id)
+            texts.append(text)
+            metadatas.append(metadata)
+            if len(texts) >= batch_size:
+                vector_store.add_texts(texts, metadatas, ids=ids, namespace=target_namespace,
+                                       embedding_chunk_size=batch_size)
+                total += len(texts)
+                ids, texts, metadatas = [], [], []
+        if texts:
+            vector_store.add_texts(texts, metadatas, ids=ids, namespace=target_namespace,
+                                   embedding_chunk_size=batch_size)
+            total += len(texts)
+        document_store.record_chunks(index_name, source_id, target_namespace, chunk_counts, replace_source=True)
+        print(f"✅ Source {source_id}: {total} vectors so far")
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        "index_name": index_name,
+        "namespace": namespace,
+        "model": model_name,
+        "sources": len(sources),
+        "vectors": total,
+        "seconds": elapsed,
+        "vectors_per_second": total / elapsed if elapsed else 0.0,
+        "chunking": splitter.report() if splitter else {},
+    }
+    print(f"🏁 Migration finished: {summary}")
+
+    if switch:
+        save_active_index(index_name, namespace, model=model_name, chunking=chunking)
+        print(f"🔀 Active index switched to '{index_name}/{namespace}'. Restart services to pick it up.")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-embed the local corpus into a new index or namespace.")
+    parser.add_argument("--index", required=True, help="target Pinecone index (created if missing)")
+    parser.add_argument("--namespace", default="default", help="target namespace")
+    parser.add_argument("--model", help="embedding model (default: current active model)")
+    parser.add_argument("--source", action="append", dest="sources", help="only migrate this source ID")
+    parser.add_argument("--reuse-chunks", action="store_true", help="re-embed stored chunks without re-chunking")
+    parser.add_argument("--chunk-tokens", type=int)
+    parser.add_argument("--overlap-tokens", type=int)
+    parser.add_argument("--overlap-mode", choices=("sentences", "tokens", "none"))
+    parser.add_argument("--overlap-sentences", type=int)
+    parser.add_argument("--batch-size", type=int, default=256, help="texts per local embedding batch")
+    parser.add_argument("--switch", action="store_true", help="make the new index the active target")
+    parser.add_argument("--stats", action="store_true", help="print corpus stats and exit")
+    args = parser.parse_args()
+
+    if args.stats:
+        print(CorpusStore().stats())
+        return
+
+    chunking = {
+        key: value for key, value in {
+            "chunk_tokens": args.chunk_tokens,
+            "overlap_tokens": args.overlap_tokens,
+            "overlap_mode": args.overlap_mode,
+            "overlap_sentences": args.overlap_sentences,
+        }.items() if value is not None
+    }
+    migrate(args.index, args.namespace, model_name=args.model, sources=args.sources,
+            reuse_chunks=args.reuse_chunks, chunking=chunking, batch_size=args.batch_size,
+            switch=args.switch)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+import time
+import uuid
+import zlib
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Record header: payload length (uint32, little endian)
+HEADER = struct.Struct("<I")
+
+
+class CorpusStore:
+    """
+    Append-only local copy of every ingested document and chunk.
+
+    Records are zlib-compressed JSON appended to segment files
+    (``segment-00001.bin``, ...) that are read back through ``mmap``; a small
+    SQLite index maps sources and documents to record offsets. Re-ingesting a
+    document appends a new version; the latest one wins.
+
+    This lets the pipeline re-chunk and re-embed everything offline (see
+    ``src.database.corpus_migrate``) instead of re-scraping through Firecrawl.
+    """
+
+    def __init__(self, root=None, segment_bytes=None):
+        state_dir = os.getenv("RAG_STATE_DIR", ".rag_state")
+        self.root = root or os.getenv("RAG_CORPUS_DIR", os.path.join(state_dir, "corpus"))
+        self.segment_bytes = segment_bytes or int(os.getenv("RAG_CORPUS_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+        self.compression_level = int(os.getenv("RAG_CORPUS_COMPRESSION_LEVEL", "6"))
+        os.makedirs(self.root, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._maps = {}
+        self._conn = sqlite3.connect(os.path.join(self.root, "index.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS records (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                source_id TEXT NOT NULL,
+                doc_id TEXT NOT NULL,
+                chunk INTEGER,
+                ingest_id TEXT NOT NULL,
+                segment INTEGER NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                created_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS records_source ON records (source_id, kind);
+            CREATE INDEX IF NOT EXISTS records_doc ON records (doc_id, ingest_id);
+            CREATE TABLE IF NOT EXISTS latest (
+                doc_id TEXT PRIMARY KEY,
+                source_id TEXT NOT NULL,
+                record_id INTEGER NOT NULL,
+                ingest_id TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS latest_source ON latest (source_id);
+            """
+        )
+        self._conn.commit()
+        self._segment = self._last_segment()
+
+    # ------------------------------------------------------------------
+    def _segment_path(self, segment):
+        return os.path.join(self.root, f"segment-{segment:05d}.bin")
+
+    def _last_segment(self):
+        segments = [int(name[8:13]) for name in os.listdir(self.root)
+                    if name.startswith("segment-") and name.endswith(".bin")]
+        return max(segments, default=1)
+
+    def _append(self, payloads):
+        """Append payload dicts to the current segment; returns ``(segment, offset, length)`` each."""
+        blobs = [zlib.compress(json.dumps(p, default=str).encode("utf-8"), self.compression_level)
+                 for p in payloads]
+        path = self._segment_path(self._segment)
+        if os.path.exists(path) and os.path.getsize(path) >= self.segment_bytes:
+            self._segment += 1
+            path = self._segment_path(self._segment)
+
+        locations = []
+        with open(path, "ab") as f:
+            offset = f.tell()
+            for blob in blobs:
+                f.write(HEADER.pack(len(blob)))
+                f.write(blob)
+                locations.append((self._segment, offset + HEADER.size, len(blob)))
+                offset += HEADER.size + len(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        # The mapping of a segment that just grew is stale
+        stale = self._maps.pop(self._segment, None)
+        if stale:
+            stale.close()
+        return locations
+
+    def _read(self, segment, offset, length):
+        segment_map = self._maps.get(segment)
+        if segment_map is None:
+            with open(self._segment_path(segment), "rb") as f:
+                segment_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment] = segment_map
+        return json.loads(zlib.decompress(segment_map[offset:offset + length]))
+
+    # ------------------------------------------------------------------
+    def append_ingest(self, source_id, documents, chunks):
+        """
+        Append one ingest of a source.
+
+        Args:
+            source_id (str): Source the content belongs to.
+            documents (list): ``(doc_id, text, metadata)`` tuples.
+            chunks (list): ``(doc_id, ordinal, text)`` tuples.
+
+        Returns:
+            str: The ingest ID.
+        """
+        ingest_id = uuid.uuid4().hex[:12]
+        payloads = [{"kind": "doc", "doc_id": d, "source_id": source_id, "text": t, "metadata": m}
+                    for d, t, m in documents]
+        payloads += [{"kind": "chunk", "doc_id": d, "source_id": source_id, "chunk": n, "text": t}
+                     for d, n, t in chunks]
+        now = time.time()
+        with self._lock:
+            locations = self._append(payloads)
+            rows = [
+                (p["kind"], source_id, p["doc_id"], p.get("chunk"), ingest_id, seg, off, length, now)
+                for p, (seg, off, length) in zip(payloads, locations)
+            ]
+            cursor = self._conn.cursor()
+            for row in rows:
+                cursor.execute(
+                    "INSERT INTO records (kind, source_id, doc_id, chunk, ingest_id, segment, offset, length,"
+                    " created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", row
+                )
+                if row[0] == "doc":
+                    cursor.execute(
+                        "INSERT OR REPLACE INTO latest VALUES (?, ?, ?, ?)",
+                        (row[2], source_id, cursor.lastrowid, ingest_id),
+                    )
+            self._conn.commit()
+        return ingest_id
+
+    # ------------------------------------------------------------------
+    def sources(self):
+        """Return ``{source_id: document_count}`` for the latest documents."""
+        with self._lock:
+            rows = self._conn.execute("SELECT source_id, COUNT(*) FROM latest GROUP BY source_id").fetchall()
+        return dict(rows)
+
+    def iter_documents(self, source_id=None):
+        """Yield the latest version of each document as a dict."""
+        sql = ("SELECT r.segment, r.offset, r.length FROM latest l JOIN records r ON r.id = l.record_id"
+               + (" WHERE l.source_id = ?" if source_id else "") + " ORDER BY r.segment, r.offset")
+        with self._lock:
+            rows = self._conn.execute(sql, (source_id,) if source_id else ()).fetchall()
+        for segment, offset, length in rows:
+            with self._lock:
+                record = self._read(segment, offset, length)
+            yield record
+
+    def iter_chunks(self, source_id=None):
+        """Yield the chunks of the latest ingest of each document."""
+        sql = ("SELECT r.segment, r.offset, r.length FROM latest l"
+               " JOIN records r ON r.doc_id = l.doc_id AND r.ingest_id = l.ingest_id AND r.kind = 'chunk'"
+               + (" WHERE l.source_id = ?" if source_id else "") + " ORDER BY r.segment, r.offset")
+        with self._lock:
+            rows = self._conn.execute(sql, (source_id,) if source_id else ()).fetchall()
+        for segment, offset, length in rows:
+            with self._lock:
+                record = self._read(segment, offset, length)
+            yield record
+
+    def forget(self, doc_ids):
+        """Drop documents from the latest view (their records stay in the segments)."""
+        doc_ids = list(doc_ids)
+        with self._lock:
+            self._conn.executemany("DELETE FROM latest WHERE doc_id = ?", [(d,) for d in doc_ids])
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            documents, sources = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT source_id) FROM latest"
+            ).fetchone()
+            records, stored = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM records").fetchone()
+        on_disk = sum(os.path.getsize(os.path.join(self.root, name))
+                      for name in os.listdir(self.root) if name.endswith(".bin"))
+        return {"sources": sources, "documents": documents, "records": records,
+                "compressed_bytes": stored, "segment_bytes": on_disk}
+
+    def close(self):
+        with self._lock:
+            for segment_map in self._maps.values():
+                segment_map.close()
+            self._maps.clear()
+            self._conn.close()
@@ -0,0 +1,347 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dotenv import load_dotenv
+
+from src.utils.url_utils import normalize_url
+
+# Load environment variables
+load_dotenv()
+
+# Firecrawl has used several keys for the page URL across API versions.
+URL_METADATA_KEYS = ("sourceURL", "source_url", "url", "source", "og_url", "ogUrl")
+
+
+class DocumentStore:
+    """
+    Local SQLite side-store for full document metadata.
+
+    Vectors in Pinecone only carry a few compact fields (``doc_id``,
+    ``chunk``, ``source_id``); the full Firecrawl metadata of each page is
+    stored here once and joined back on demand.
+    """
+
+    def __init__(self, path=None):
+        state_dir = os.getenv("RAG_STATE_DIR", ".rag_state")
+        self.path = path or os.getenv("RAG_DOCSTORE_PATH", os.path.join(state_dir, "documents.sqlite3"))
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                doc_id TEXT PRIMARY KEY,
+                source_id TEXT NOT NULL,
+                url TEXT,
+                metadata TEXT,
+                content_hash TEXT,
+                updated_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS documents_source ON documents (source_id);
+            CREATE TABLE IF NOT EXISTS sources (
+                source_id TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                mode TEXT,
+                num_docs INTEGER,
+                last_ingested_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS source_ttl (
+                source_id TEXT PRIMARY KEY,
+                ttl_seconds REAL NOT NULL
+            );
+            """
+        )
+        self._create_chunk_ledger()
+        self._conn.commit()
+        print(f"✅ DocumentStore ready at {self.path}")
+
+    def _create_chunk_ledger(self):
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(chunk_ledger)")]
+        if columns and "index_name" not in columns:
+            self._conn.execute("ALTER TABLE chunk_ledger RENAME TO chunk_ledger_unindexed")
+            self._conn.execute("DROP INDEX IF EXISTS chunk_ledger_source")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS chunk_ledger (
+                index_name TEXT NOT NULL,
+                doc_id TEXT NOT NULL,
+                namespace TEXT NOT NULL,
+                source_id TEXT NOT NULL,
+                live_chunks INTEGER NOT NULL,
+                written_chunks INTEGER NOT NULL,
+                updated_at REAL,
+                PRIMARY KEY (index_name, doc_id, namespace)
+            );
+            CREATE INDEX IF NOT EXISTS chunk_ledger_source ON chunk_ledger (source_id);
+            """
+        )
+        unindexed = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chunk_ledger_unindexed'"
+        ).fetchone()
+        if unindexed:
+            # Ledgers from before it was keyed by index belong to the index in use then
+            from src.database.active_index import load_active_index
+
+            index_name = load_active_index().get("index_name") or os.getenv("PINECONE_INDEX_NAME") or "pavan"
+            self._conn.execute(
+                "INSERT OR IGNORE INTO chunk_ledger SELECT ?, doc_id, namespace, source_id, live_chunks,"
+                " written_chunks, updated_at FROM chunk_ledger_unindexed",
+                (index_name,),
+            )
+            self._conn.execute("DROP TABLE chunk_ledger_unindexed")
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def document_url(metadata):
+        """Return the page URL recorded in Firecrawl metadata, if any."""
+        for key in URL_METADATA_KEYS:
+            value = (metadata or {}).get(key)
+            if isinstance(value, str) and value:
+                return value
+        return None
+
+    @staticmethod
+    def make_doc_id(page_url, source_id):
+        """
+        Compact, stable document ID derived from the source and page URL.
+
+        Scoping by source keeps a page that belongs to two sources (e.g. a
+        crawled site and a single-page scrape inside it) from sharing vector
+        IDs, so neither ingest overwrites or expires the other's copy.
+        """
+        key = f"{source_id}|{normalize_url(page_url)}"
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def content_hash(text):
+        return hashlib.sha1((text or "").encode("utf-8")).hexdigest()
+
+    # ------------------------------------------------------------------
+    def put_documents(self, source_id, documents):
+        """
+        Store or replace full metadata for ``documents``.
+
+        Args:
+            source_id (str): Source the documents were ingested from.
+            documents (list): ``(doc_id, url, metadata, content_hash)`` tuples.
+        """
+        now = time.time()
+        rows = [
+            (doc_id, source_id, url, json.dumps(metadata, default=str), content_hash, now)
+            for doc_id, url, metadata, content_hash in documents
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def record_source(self, source_id, url, mode, num_docs):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?)",
+                (source_id, url, mode, num_docs, time.time()),
+            )
+            self._conn.commit()
+
+    # ------------------------------------------------------------------
+    def get_metadata(self, doc_ids):
+        """Return ``{doc_id: metadata}`` for the given document IDs."""
+        doc_ids = list(set(doc_ids))
+        if not doc_ids:
+            return {}
+        placeholders = ",".join("?" for _ in doc_ids)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT doc_id, metadata FROM documents WHERE doc_id IN ({placeholders})", doc_ids
+            ).fetchall()
+        return {doc_id: json.loads(metadata) for doc_id, metadata in rows}
+
+    def get_document(self, doc_id):
+        """Return ``(source_id, url)`` of a stored document, or None."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT source_id, url FROM documents WHERE doc_id = ?", (doc_id,)
+            ).fetchone()
+
+    def get_content_hash(self, doc_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash FROM documents WHERE doc_id = ?", (doc_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def list_documents(self, source_id):
+        """Return ``(doc_id, url, content_hash, updated_at)`` rows for a source."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT doc_id, url, content_hash, updated_at FROM documents WHERE source_id = ?",
+                (source_id,),
+            ).fetchall()
+
+    def get_source(self, source_id):
+        """Return a source as a dict (see ``list_sources``), or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT source_id, url, mode, num_docs, last_ingested_at FROM sources WHERE source_id = ?",
+                (source_id,),
+            ).fetchone()
+        keys = ("source_id", "url", "mode", "num_docs", "last_ingested_at")
+        return dict(zip(keys, row)) if row else None
+
+    def has_source(self, source_id):
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM sources WHERE source_id = ?", (source_id,)).fetchone()
+        return row is not None
+
+    def list_sources(self):
+        """Return every ingested source as a dict."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT source_id, url, mode, num_docs, last_ingested_at FROM sources"
+            ).fetchall()
+        keys = ("source_id", "url", "mode", "num_docs", "last_ingested_at")
+        return [dict(zip(keys, row)) for row in rows]
+
+    # ------------------------------------------------------------------
+    # Chunk ledger: which vector IDs (``doc_id:0 .. doc_id:n-1``) are live
+    # per index and namespace, and how many have ever been written.
+    # Everything written but not live is an orphan that ``VectorGC`` can delete.
+    def record_chunks(self, index_name, source_id, namespace, chunk_counts, replace_source=False):
+        """
+        Record the live chunk set of a successful ingest.
+
+        Args:
+            index_name (str): Pinecone index the chunks were written to.
+            source_id (str): Source the chunks were ingested from.
+            namespace (str): Pinecone namespace they were written to.
+            chunk_counts (dict): ``{doc_id: number_of_chunks}``.
+            replace_source (bool): The ingest covered the whole source, so
+                documents of the source missing from ``chunk_counts`` are no
+                longer live.
+        """
+        now = time.time()
+        with self._lock:
+            if replace_source:
+                self._conn.execute(
+                    "UPDATE chunk_ledger SET live_chunks = 0, updated_at = ?"
+                    " WHERE index_name = ? AND source_id = ? AND namespace = ?",
+                    (now, index_name, source_id, namespace),
+                )
+            self._conn.executemany(
+                "INSERT INTO chunk_ledger VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (index_name, doc_id, namespace) DO UPDATE SET source_id = excluded.source_id,"
+                " live_chunks = excluded.live_chunks,"
+                " written_chunks = MAX(written_chunks, excluded.written_chunks), updated_at = excluded.updated_at",
+                [(index_name, doc_id, namespace, source_id, count, count, now)
+                 for doc_id, count in chunk_counts.items()],
+            )
+            self._conn.commit()
+
+    def has_chunks(self, index_name, source_id):
+        """Whether the ledger tracks any chunk of ``source_id`` in ``index_name``."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM chunk_ledger WHERE index_name = ? AND source_id = ? LIMIT 1",
+                (index_name, source_id),
+            ).fetchone()
+        return row is not None
+
+    def expire_source(self, source_id):
+        """Mark every chunk of a source, in every index, as no longer live."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE chunk_ledger SET live_chunks = 0, updated_at = ? WHERE source_id = ?",
+                (time.time(), source_id),
+            )
+            self._conn.commit()
+
+    def reclaimable(self, index_name, source_id=None):
+        """Return ``(doc_id, namespace, source_id, live_chunks, written_chunks)`` rows with orphans."""
+        sql = ("SELECT doc_id, namespace, source_id, live_chunks, written_chunks FROM chunk_ledger"
+               " WHERE index_name = ? AND written_chunks > live_chunks" + (" AND source_id = ?" if source_id else ""))
+        with self._lock:
+            return self._conn.execute(sql, (index_name, source_id) if source_id else (index_name,)).fetchall()
+
+    def live_chunks(self, index_name, namespace):
+        """Return ``{doc_id: live_chunks}`` for a namespace of an index."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT doc_id, live_chunks FROM chunk_ledger WHERE index_name = ? AND namespace = ?",
+                (index_name, namespace),
+            ).fetchall()
+        return dict(rows)
+
+    def mark_collected(self, index_name, doc_id, namespace):
+        """
+        Record that a document's orphans were deleted; documents with no
+        live chunks left in any index are dropped from the store entirely.
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE chunk_ledger SET written_chunks = live_chunks"
+                " WHERE index_name = ? AND doc_id = ? AND namespace = ?",
+                (index_name, doc_id, namespace),
+            )
+            self._conn.execute(
+                "DELETE FROM chunk_ledger WHERE index_name = ? AND doc_id = ? AND namespace = ? AND live_chunks = 0",
+                (index_name, doc_id, namespace),
+            )
+            self._conn.execute(
+                "DELETE FROM documents WHERE doc_id = ?"
+                " AND NOT EXISTS (SELECT 1 FROM chunk_ledger WHERE chunk_ledger.doc_id = documents.doc_id)",
+                (doc_id,),
+            )
+            self._conn.commit()
+
+    def ledger_stats(self, index_name=None):
+        """Live and reclaimable vector counts, for one index or all of them."""
+        sql = ("SELECT COALESCE(SUM(live_chunks), 0), COALESCE(SUM(written_chunks), 0), COUNT(*)"
+               " FROM chunk_ledger" + (" WHERE index_name = ?" if index_name else ""))
+        with self._lock:
+            live, written, documents = self._conn.execute(sql, (index_name,) if index_name else ()).fetchone()
+        return {"documents": documents, "live_vectors": live, "reclaimable_vectors": written - live}
+
+    # ------------------------------------------------------------------
+    def set_source_ttl(self, source_id, ttl_seconds):
+        """Expire a source ``ttl_seconds`` after its last ingest (``None`` clears it)."""
+        with self._lock:
+            if ttl_seconds is None:
+                self._conn.execute("DELETE FROM source_ttl WHERE source_id = ?", (source_id,))
+            else:
+                self._conn.execute("INSERT OR REPLACE INTO source_ttl VALUES (?, ?)", (source_id, ttl_seconds))
+            self._conn.commit()
+
+    def expired_sources(self, default_ttl=None, now=None):
+        """Return IDs of sources whose TTL (per-source or ``default_ttl``) has passed."""
+        now = now or time.time()
+        with self._lock:
+            # Single-page re-scrapes (recrawl scheduler) keep a source fresh too
+            rows = self._conn.execute(
+                "SELECT s.source_id, MAX(s.last_ingested_at, COALESCE(("
+                "  SELECT MAX(d.updated_at) FROM documents d WHERE d.source_id = s.source_id), 0)),"
+                " t.ttl_seconds FROM sources s"
+                " LEFT JOIN source_ttl t ON t.source_id = s.source_id"
+            ).fetchall()
+        expired = []
+        for source_id, last_ingested_at, ttl in rows:
+            ttl = ttl if ttl is not None else default_ttl
+            if ttl and last_ingested_at and now - last_ingested_at > ttl:
+                expired.append(source_id)
+        return expired
+
+    def forget_source(self, source_id):
+        """Drop an expired source so it is not expired (or re-crawled) again."""
+        with self._lock:
+            self._conn.execute("DELETE FROM sources WHERE source_id = ?", (source_id,))
+            self._conn.execute("DELETE FROM source_ttl WHERE source_id = ?", (source_id,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
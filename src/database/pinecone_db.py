@@ -1,9 +1,23 @@
 import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
+from src.utils.deadline import DeadlineExceeded, hedged_call
+from src.utils.metrics import stage_metrics
+from src.utils.rate_limiter import limited_call, rate_limit
+
 # Load environment variables
 load_dotenv()
 
+# Process-wide caches so that repeated pipeline construction (e.g. every
+# Streamlit rerun) does not re-list indexes or rebuild the SDK client.
+_CLIENT_CACHE = {}
+_INDEX_CACHE = {}
+_CACHE_LOCK = threading.Lock()
+
 class PineconeDatabase:
     """
     A class to handle Pinecone vector database operations.
@@ -20,33 +34,78 @@ class PineconeDatabase:
 
         self.index_name = index_name
         self.namespace = namespace
+        self.index_cache_ttl = float(os.getenv("PINECONE_INDEX_CACHE_TTL", "3600"))
+        self.index = None
+        self._namespaces_cache = None
 
     # ------------------------------------------------------------------
-    def create_vector_store(self, embedding_function):
+    def _client(self):
+        """Return a shared Pinecone client for this API key."""
+        from pinecone import Pinecone
+
+        with _CACHE_LOCK:
+            pc = _CLIENT_CACHE.get(self.api_key)
+            if pc is None:
+                print("🔧 [DEBUG] Initializing Pinecone (v3 SDK)...")
+                # PINECONE_HOST points the control plane at a local stand-in
+                # (Pinecone Local or the load-test fake).
+                host = os.getenv("PINECONE_HOST")
+                pc = Pinecone(api_key=self.api_key, host=host) if host else Pinecone(api_key=self.api_key)
+                _CLIENT_CACHE[self.api_key] = pc
+            return pc
+
+    def _ensure_index(self, pc, dimension=None):
+        """
+        Make sure the index exists and return its host.
+
+        The index metadata is cached per process so that later pipelines skip
+        the ``list_indexes`` / ``describe_index`` round-trips.
+        """
+        from pinecone import ServerlessSpec
+
+        cache_key = (self.api_key, self.index_name)
+        cached = _INDEX_CACHE.get(cache_key)
+        if cached and time.time() - cached["cached_at"] < self.index_cache_ttl:
+            print(f"✅ Using cached metadata for index '{self.index_name}'.")
+            return cached["host"]
+
+        existing_indexes = {index["name"]: index for index in pc.list_indexes()}
+        print(f"📋 Existing Pinecone indexes: {list(existing_indexes)}")
+
+        if self.index_name not in existing_indexes:
+            print(f"🆕 Index '{self.index_name}' does not exist. Creating it now...")
+            embedding_dim = dimension or int(os.getenv("EMBEDDING_DIMENSION", "768"))
+            pc.create_index(
+                name=self.index_name,
+                dimension=embedding_dim,
+                metric="cosine",
+                spec=ServerlessSpec(cloud="aws", region=self.environment)
+            )
+            print(f"✅ Index '{self.index_name}' created successfully.")
+            host = pc.describe_index(self.index_name)["host"]
+        else:
+            print(f"✅ Using existing index '{self.index_name}'.")
+            host = existing_indexes[self.index_name]["host"]
+
+        with _CACHE_LOCK:
+            _INDEX_CACHE[cache_key] = {"host": host, "cached_at": time.time()}
+        return host
+
+    def open_index(self, dimension=None):
+        """Return the data-plane handle of the index, creating the index if needed."""
+        if self.index is None:
+            pc = self._client()
+            self.index = pc.Index(host=self._ensure_index(pc, dimension))
+        return self.index
+
+    # ------------------------------------------------------------------
+    def create_vector_store(self, embedding_function, dimension=None):
         try:
-            from pinecone import Pinecone, ServerlessSpec
             from langchain_pinecone import PineconeVectorStore
 
-            print("🔧 [DEBUG] Initializing Pinecone (v3 SDK)...")
-            pc = Pinecone(api_key=self.api_key)
-            existing_indexes = [index["name"] for index in pc.list_indexes()]
-            print(f"📋 Existing Pinecone indexes: {existing_indexes}")
-
-            if self.index_name not in existing_indexes:
-                print(f"🆕 Index '{self.index_name}' does not exist. Creating it now...")
-                embedding_dim = int(os.getenv("EMBEDDING_DIMENSION", "768"))
-                pc.create_index(
-                    name=self.index_name,
-                    dimension=embedding_dim,
-                    metric="cosine",
-                    spec=ServerlessSpec(cloud="aws", region=self.environment)
-                )
-                print(f"✅ Index '{self.index_name}' created successfully.")
-            else:
-                print(f"✅ Using existing index '{self.index_name}'.")
-
-            vector_store = PineconeVectorStore.from_existing_index(
-                index_name=self.index_name,
+            self.open_index(dimension)
+            vector_store = PineconeVectorStore(
+                index=self.index,
                 embedding=embedding_function,
                 namespace=self.namespace
             )
@@ -58,47 +117,213 @@ class PineconeDatabase:
             return None
 
     # ------------------------------------------------------------------
-    def add_documents(self, vector_store, documents):
-        """Add documents safely with metadata cleaning."""
-        try:
-            if not vector_store:
-                raise ValueError("Vector store not initialized before adding documents.")
-
-            print(f"📥 Adding {len(documents)} documents to Pinecone...")
-
-            # 🧹 Clean metadata
-            for doc in documents:
-                if hasattr(doc, "metadata") and isinstance(doc.metadata, dict):
-                    clean_meta = {}
-                    for k, v in doc.metadata.items():
-                        if v is None:
-                            continue
-                        elif isinstance(v, (str, int, float, bool)):
-                            clean_meta[k] = v
-                        elif isinstance(v, list):
-                            clean_meta[k] = [str(x) for x in v]
-                        else:
-                            clean_meta[k] = str(v)
-                    doc.metadata = clean_meta
-
-            ids = vector_store.add_documents(documents)
-            print(f"✅ Successfully added {len(ids)} documents to Pinecone.")
-            return ids
+    def add_documents(self, vector_store, documents, namespace=None, ids=None, batch_size=100):
+        """
+        Add documents safely with metadata cleaning.
 
-        except Exception as e:
-            print(f"❌ Error adding documents to vector store: {str(e)}")
-            return []
+        Chunk metadata is expected to be compact (see ``DocumentStore``);
+        pass ``ids`` to make re-ingestion overwrite existing vectors. The
+        documents are embedded first and only the upserts go through the
+        Pinecone rate limiter, so a slot is never held during (or a throttled
+        retry never repeats) the embedding.
+        """
+        with stage_metrics.timer("pinecone.upsert") as timer:
+            try:
+                if not vector_store:
+                    raise ValueError("Vector store not initialized before adding documents.")
+
+                print(f"📥 Adding {len(documents)} documents to Pinecone...")
+
+                # 🧹 Clean metadata
+                for doc in documents:
+                    if hasattr(doc, "metadata") and isinstance(doc.metadata, dict):
+                        clean_meta = {}
+                        for k, v in doc.metadata.items():
+                            if v is None:
+                                continue
+                            elif isinstance(v, (str, int, float, bool)):
+                                clean_meta[k] = v
+                            elif isinstance(v, list):
+                                clean_meta[k] = [str(x) for x in v]
+                            else:
+                                clean_meta[k] = str(v)
+                        doc.metadata = clean_meta
+
+                texts = [doc.page_content for doc in documents]
+                ids = list(ids) if ids is not None else [str(uuid.uuid4()) for _ in documents]
+                with stage_metrics.timer("embed.documents"):
+                    embeddings = vector_store.embeddings.embed_documents(texts)
+
+                # Same layout as PineconeVectorStore.add_texts: the chunk text lives in metadata
+                text_key = getattr(vector_store, "_text_key", "text")
+                vectors = [
+                    {"id": vector_id, "values": values, "metadata": {**doc.metadata, text_key: text}}
+                    for vector_id, values, doc, text in zip(ids, embeddings, documents, texts)
+                ]
+                index = self.open_index()
+                for i in range(0, len(vectors), batch_size):
+                    batch = vectors[i:i + batch_size]
+                    limited_call("pinecone", lambda: index.upsert(vectors=batch, namespace=namespace or self.namespace))
+
+                print(f"✅ Successfully added {len(ids)} documents to Pinecone.")
+                self._note_namespace(namespace or self.namespace)
+                return ids
+
+            except Exception as e:
+                timer.ok = False
+                print(f"❌ Error adding documents to vector store: {str(e)}")
+                return []
 
     # ------------------------------------------------------------------
-    def similarity_search(self, vector_store, query, k=4):
-        """Perform a similarity search."""
-        try:
-            if not vector_store:
-                raise ValueError("Vector store not initialized before performing similarity search.")
-            print(f"🔍 Performing similarity search for query: {query[:80]}...")
-            results = vector_store.similarity_search(query, k=k)
-            print(f"✅ Retrieved {len(results)} similar documents.")
-            return results
-        except Exception as e:
-            print(f"❌ Error performing similarity search: {str(e)}")
+    def similarity_search(self, vector_store, query, k=4, filter=None, namespace=None, deadline=None):
+        """
+        Perform a similarity search, optionally restricted by a metadata filter.
+
+        The query is embedded once and the Pinecone request is hedged: if it
+        has not answered by the recent p95 latency a duplicate is sent and the
+        first response wins. Raises ``DeadlineExceeded`` when ``deadline``
+        (a ``src.utils.deadline.Deadline``) runs out first.
+        """
+        with stage_metrics.timer("pinecone.query") as timer:
+            try:
+                if not vector_store:
+                    raise ValueError("Vector store not initialized before performing similarity search.")
+                print(f"🔍 Performing similarity search for query: {query[:80]}...")
+                embedding = vector_store.embeddings.embed_query(query)
+                scored = self._hedged_search(vector_store, embedding, k, filter, namespace or self.namespace, deadline)
+                results = [doc for doc, _ in scored]
+                print(f"✅ Retrieved {len(results)} similar documents.")
+                return results
+            except DeadlineExceeded:
+                timer.ok = False
+                raise
+            except Exception as e:
+                timer.ok = False
+                print(f"❌ Error performing similarity search: {str(e)}")
+                return []
+
+    def _hedged_search(self, vector_store, embedding, k, filter, namespace, deadline):
+        def search():
+            with rate_limit("pinecone", deadline=deadline):
+                return vector_store.similarity_search_by_vector_with_score(
+                    embedding, k=k, filter=filter, namespace=namespace
+                )
+
+        if os.getenv("PINECONE_HEDGE", "1") == "0":
+            return search()
+        return hedged_call(search, "pinecone.query", deadline=deadline)
+
+    # ------------------------------------------------------------------
+    def similarity_search_namespaces(self, vector_store, query, namespaces, k=4, filter=None, deadline=None):
+        """
+        Search several namespaces with a single query embedding and merge the
+        top ``k`` results by score. Each per-namespace request is hedged like
+        ``similarity_search``.
+        """
+        with stage_metrics.timer("pinecone.query") as timer:
+            try:
+                if not vector_store:
+                    raise ValueError("Vector store not initialized before performing similarity search.")
+                if not namespaces:
+                    return []
+                print(f"🔍 Searching {len(namespaces)} namespaces for query: {query[:80]}...")
+                embedding = vector_store.embeddings.embed_query(query)
+
+                def search(namespace):
+                    return self._hedged_search(vector_store, embedding, k, filter, namespace, deadline)
+
+                max_workers = min(len(namespaces), int(os.getenv("PINECONE_QUERY_FANOUT", "8")))
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    scored = [hit for hits in executor.map(search, namespaces) for hit in hits]
+
+                scored.sort(key=lambda hit: hit[1], reverse=True)
+                results = [doc for doc, _ in scored[:k]]
+                print(f"✅ Retrieved {len(results)} similar documents.")
+                return results
+            except DeadlineExceeded:
+                timer.ok = False
+                raise
+            except Exception as e:
+                timer.ok = False
+                print(f"❌ Error performing similarity search: {str(e)}")
+                return []
+
+    # ------------------------------------------------------------------
+    def delete_vectors(self, ids, namespace=None, batch_size=1000):
+        """Delete vectors by ID in batches (Pinecone accepts at most 1000 per call)."""
+        ids = list(ids)
+        deleted = 0
+        for i in range(0, len(ids), batch_size):
+            batch = ids[i:i + batch_size]
+            with stage_metrics.timer("pinecone.delete"):
+                limited_call("pinecone", lambda: self.open_index().delete(
+                    ids=batch, namespace=namespace or self.namespace
+                ))
+            deleted += len(batch)
+        return deleted
+
+    def delete_source_vectors(self, source_id, namespace=None):
+        """
+        Delete every vector tagged with ``source_id`` by metadata filter.
+
+        Reaches vectors whose IDs are not tracked (e.g. random IDs from before
+        chunk IDs were deterministic); serverless indexes that reject
+        filtered deletes raise.
+        """
+        with stage_metrics.timer("pinecone.delete"):
+            limited_call("pinecone", lambda: self.open_index().delete(
+                filter={"source_id": {"$eq": source_id}}, namespace=namespace or self.namespace
+            ))
+
+    def fetch_metadata(self, ids, namespace=None, batch_size=100):
+        """Return ``{vector_id: metadata}`` for the given IDs."""
+        ids = list(ids)
+        metadata = {}
+        for i in range(0, len(ids), batch_size):
+            batch = ids[i:i + batch_size]
+            response = limited_call("pinecone", lambda: self.open_index().fetch(
+                ids=batch, namespace=namespace or self.namespace
+            ))
+            vectors = getattr(response, "vectors", None)
+            if vectors is None:
+                vectors = response.get("vectors") or {}
+            for vector_id, vector in vectors.items():
+                meta = vector.get("metadata") if isinstance(vector, dict) else getattr(vector, "metadata", None)
+                metadata[vector_id] = meta or {}
+        return metadata
+
+    def list_vector_ids(self, namespace=None, prefix=None):
+        """Yield every vector ID in a namespace (serverless indexes only)."""
+        kwargs = {"namespace": namespace or self.namespace}
+        if prefix:
+            kwargs["prefix"] = prefix
+        for page in self.open_index().list(**kwargs):
+            yield from page
+
+    def index_stats(self):
+        """Total and per-namespace vector counts."""
+        stats = self.open_index().describe_index_stats()
+        namespaces = {
+            name: (info.get("vector_count") if isinstance(info, dict) else info.vector_count)
+            for name, info in (stats.get("namespaces") or {}).items()
+        }
+        return {"total_vectors": stats.get("total_vector_count", sum(namespaces.values())),
+                "namespaces": namespaces}
+
+    def _note_namespace(self, namespace):
+        """Drop the cached namespace list once a namespace it lacks is written to."""
+        cached = self._namespaces_cache
+        if cached is not None and namespace not in cached[1]:
+            self._namespaces_cache = None
+
+    # ------------------------------------------------------------------
+    def list_namespaces(self, prefix="", max_age=60):
+        """List namespaces in the index (cached for ``max_age`` seconds)."""
+        if self.index is None:
             return []
+        cached = self._namespaces_cache
+        if cached is None or time.time() - cached[0] > max_age:
+            stats = self.index.describe_index_stats()
+            cached = (time.time(), list((stats.get("namespaces") or {}).keys()))
+            self._namespaces_cache = cached
+        return [ns for ns in cached[1] if ns.startswith(prefix)]
@@ -0,0 +1,268 @@
+"""
+Garbage collection of stale vectors.
+
+Chunk IDs are deterministic (``{doc_id}:{ordinal}``), so the ``DocumentStore``
+chunk ledger knows exactly which IDs each document has ever written and how
+many of them the latest successful ingest still uses. Anything beyond that
+is an orphan:
+
+* a page that now splits into fewer chunks leaves its higher ordinals behind;
+* a page missing from the latest full crawl of its source has no live chunks;
+* a source whose TTL passed without a re-ingest expires entirely.
+
+Orphans are deleted from Pinecone in batches. The ledger is kept per index,
+so a migrated index (see ``corpus_migrate``) is collected on its own.
+
+Vectors written before the ledger existed are handled as well. An expiring
+source without ledger entries is first looked up in the namespace listing,
+and whatever the listing cannot attribute is removed by a ``source_id``
+metadata filter. ``--scan`` walks the namespace listing too. It adopts
+untracked chunks of live pages into the ledger and deletes those whose page
+was re-ingested under a newer ID or whose source is gone. That includes
+random IDs from before chunk IDs were deterministic, which are matched by
+their metadata.
+
+Example:
+    python -m src.database.vector_gc --stats
+    python -m src.database.vector_gc --ttl-days 30 --source https://example.com
+    python -m src.database.vector_gc --expire --scan
+"""
+
+import argparse
+import os
+from collections import defaultdict
+
+from dotenv import load_dotenv
+
+from src.database.active_index import load_active_index
+from src.database.document_store import DocumentStore
+from src.database.pinecone_db import PineconeDatabase
+from src.rag_pipeline import namespace_for_source
+from src.utils.url_utils import source_id_for_url
+
+# Load environment variables
+load_dotenv()
+
+
+class VectorGC:
+    """
+    Delete orphaned vectors recorded in the chunk ledger.
+
+    Args:
+        db (PineconeDatabase): Database whose index holds the vectors; only
+            ledger entries of that index are collected.
+        document_store (DocumentStore): Store holding the chunk ledger.
+        corpus_store (CorpusStore, optional): Removed documents are dropped
+            from its latest view so migrations do not resurrect them.
+        batch_size (int, optional): IDs per delete call (``RAG_GC_BATCH_SIZE``).
+        default_ttl (float, optional): Seconds after which a source that was
+            not re-ingested expires (``RAG_GC_SOURCE_TTL_DAYS``; unset = never).
+    """
+
+    def __init__(self, db, document_store, corpus_store=None, batch_size=None, default_ttl=None):
+        self.db = db
+        self.document_store = document_store
+        self.corpus_store = corpus_store
+        self.batch_size = batch_size or int(os.getenv("RAG_GC_BATCH_SIZE", "1000"))
+        ttl_days = float(os.getenv("RAG_GC_SOURCE_TTL_DAYS", "0"))
+        self.default_ttl = default_ttl if default_ttl is not None else (ttl_days * 86400 or None)
+
+    # ------------------------------------------------------------------
+    def collect(self, source_id=None, dry_run=False):
+        """
+        Delete the orphans of one source (or all sources).
+
+        Returns a summary dict with the number of vectors deleted.
+        """
+        index_name = self.db.index_name
+        rows = self.document_store.reclaimable(index_name, source_id)
+        by_namespace = defaultdict(list)
+        for doc_id, namespace, _, live, written in rows:
+            by_namespace[namespace].append((doc_id, live, written))
+
+        deleted, removed_docs = 0, []
+        for namespace, docs in by_namespace.items():
+            ids = [f"{doc_id}:{n}" for doc_id, live, written in docs for n in range(live, written)]
+            if dry_run:
+                deleted += len(ids)
+                continue
+            deleted += self.db.delete_vectors(ids, namespace=namespace, batch_size=self.batch_size)
+            for doc_id, live, _ in docs:
+                self.document_store.mark_collected(index_name, doc_id, namespace)
+                if not live:
+                    removed_docs.append(doc_id)
+
+        if removed_docs and self.corpus_store is not None:
+            self.corpus_store.forget(removed_docs)
+        if deleted:
+            verb = "Would delete" if dry_run else "Deleted"
+            print(f"🧹 {verb} {deleted} stale vectors from {len(rows)} documents")
+        return {"documents": len(rows), "vectors_deleted": 0 if dry_run else deleted,
+                "vectors_reclaimable": deleted if dry_run else 0, "documents_removed": len(removed_docs)}
+
+    def _source_namespaces(self, source_id):
+        """Namespaces a source's vectors can be in, under either routing mode."""
+        routing = os.getenv("RAG_SOURCE_ROUTING", "filter")
+        return sorted({self.db.namespace, namespace_for_source(self.db.namespace, source_id, routing)})
+
+    def seed_source(self, source_id):
+        """
+        Record the chunks of a source ingested before the ledger existed.
+
+        Each stored document of the source is looked up in the namespace
+        listing (serverless indexes only), and the chunks found are recorded
+        as live. Sources the ledger already tracks are left as they are.
+        Returns the number of vectors recorded.
+        """
+        index_name = self.db.index_name
+        if self.document_store.has_chunks(index_name, source_id):
+            return 0
+        documents = self.document_store.list_documents(source_id)
+        seeded = 0
+        for namespace in self._source_namespaces(source_id):
+            counts = {}
+            for doc_id, *_ in documents:
+                ordinals = [int(ordinal) for ordinal in (
+                    vector_id.rpartition(":")[2]
+                    for vector_id in self.db.list_vector_ids(namespace=namespace, prefix=f"{doc_id}:")
+                ) if ordinal.isdigit()]
+                if ordinals:
+                    counts[doc_id] = max(ordinals) + 1
+            if counts:
+                self.document_store.record_chunks(index_name, source_id, namespace, counts)
+                seeded += sum(counts.values())
+        return seeded
+
+    def expire_sources(self, dry_run=False):
+        """Expire and collect every source whose TTL has passed."""
+        expired = self.document_store.expired_sources(self.default_ttl)
+        deleted = 0
+        for source_id in expired:
+            print(f"⌛ Source {source_id} expired")
+            if dry_run:
+                continue
+            try:
+                self.seed_source(source_id)
+            except Exception as e:
+                print(f"⚠️ Could not list the vectors of {source_id}: {e}")
+            self.document_store.expire_source(source_id)
+            deleted += self.collect(source_id)["vectors_deleted"]
+            # Vectors the ledger never knew about (e.g. random IDs)
+            for namespace in self._source_namespaces(source_id):
+                try:
+                    self.db.delete_source_vectors(source_id, namespace=namespace)
+                except Exception as e:
+                    print(f"⚠️ Filtered delete of {source_id} in '{namespace}' failed ({e}); run --scan to remove the rest")
+            self.document_store.forget_source(source_id)
+        return {"sources_expired": len(expired), "source_ids": expired, "vectors_deleted": deleted}
+
+    def _superseded(self, doc_id, source_id, url, live):
+        """Whether an untracked chunk's page is stale: its source is gone or it was re-ingested since."""
+        if not self.document_store.has_source(source_id):
+            return True
+        current = DocumentStore.make_doc_id(url, source_id) if url else None
+        return current is not None and current != doc_id and current in live
+
+    def scan(self, namespaces=None, dry_run=False):
+        """
+        Compare the namespace listing against the ledger and delete vectors
+        that belong to no live chunk.
+
+        Chunks the ledger does not know were written before it existed:
+
+        * ``doc_id:n`` IDs of a stored document are adopted into the ledger
+          as live, unless the page is stale (see ``_superseded``);
+          unknown documents are deleted;
+        * other IDs (random IDs from before chunk IDs were deterministic)
+          are matched by their ``source_id`` and page URL metadata and
+          deleted when stale; those without either are left alone.
+        """
+        self.db.open_index()
+        index_name = self.db.index_name
+        namespaces = namespaces or [self.db.namespace] + self.db.list_namespaces(prefix=f"{self.db.namespace}-")
+        deleted = seeded = kept = 0
+        for namespace in namespaces:
+            live = self.document_store.live_chunks(index_name, namespace)
+            orphans, untracked, seeds = [], [], defaultdict(dict)
+            for vector_id in self.db.list_vector_ids(namespace=namespace):
+                doc_id, _, ordinal = vector_id.rpartition(":")
+                if not doc_id or not ordinal.isdigit():
+                    untracked.append(vector_id)
+                elif doc_id in live:
+                    if int(ordinal) >= live[doc_id]:
+                        orphans.append(vector_id)
+                else:
+                    document = self.document_store.get_document(doc_id)
+                    if document is None or self._superseded(doc_id, document[0], document[1], live):
+                        orphans.append(vector_id)
+                    else:
+                        counts = seeds[document[0]]
+                        counts[doc_id] = max(counts.get(doc_id, 0), int(ordinal) + 1)
+
+            for vector_id, metadata in self.db.fetch_metadata(untracked, namespace=namespace).items():
+                source_id, url = metadata.get("source_id"), DocumentStore.document_url(metadata)
+                if source_id and url and self._superseded(None, source_id, url, live):
+                    orphans.append(vector_id)
+                else:
+                    kept += 1
+
+            if not dry_run:
+                if orphans:
+                    self.db.delete_vectors(orphans, namespace=namespace, batch_size=self.batch_size)
+                for source_id, counts in seeds.items():
+                    self.document_store.record_chunks(index_name, source_id, namespace, counts)
+            deleted += len(orphans)
+            seeded += sum(sum(counts.values()) for counts in seeds.values())
+            print(f"🔎 Namespace '{namespace}': {len(orphans)} unreferenced vectors")
+        return {"namespaces": len(namespaces), "vectors_deleted": 0 if dry_run else deleted,
+                "vectors_reclaimable": deleted if dry_run else 0,
+                "vectors_adopted": seeded, "untracked_vectors_kept": kept}
+
+    def stats(self):
+        """Index size from Pinecone alongside live and reclaimable counts from the ledger."""
+        stats = {"ledger": self.document_store.ledger_stats(self.db.index_name)}
+        try:
+            stats["index"] = self.db.index_stats()
+        except Exception as e:
+            print(f"⚠️ Could not read index stats: {e}")
+            stats["index"] = None
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delete stale vectors left behind by re-ingests.")
+    parser.add_argument("--index-name", default=os.getenv("PINECONE_INDEX_NAME"))
+    parser.add_argument("--namespace", default=os.getenv("PINECONE_NAMESPACE"))
+    parser.add_argument("--source", help="only this source URL")
+    parser.add_argument("--expire", action="store_true", help="also expire sources past their TTL")
+    parser.add_argument("--scan", action="store_true", help="also scan the namespace listing for unknown IDs")
+    parser.add_argument("--ttl-days", type=float, help="set the TTL of --source (0 clears it) and exit")
+    parser.add_argument("--dry-run", action="store_true", help="report what would be deleted")
+    parser.add_argument("--stats", action="store_true", help="print index and ledger stats and exit")
+    args = parser.parse_args()
+
+    active = load_active_index()
+    db = PineconeDatabase(index_name=args.index_name or active.get("index_name", "pavan"),
+                          namespace=args.namespace or active.get("namespace", "default"))
+    gc = VectorGC(db, DocumentStore())
+    source_id = source_id_for_url(args.source) if args.source else None
+
+    if args.stats:
+        print(gc.stats())
+        return
+    if args.ttl_days is not None:
+        if not source_id:
+            parser.error("--ttl-days needs --source")
+        gc.document_store.set_source_ttl(source_id, args.ttl_days * 86400 or None)
+        print(f"✅ TTL of {args.source} set to {args.ttl_days or 'none'} days")
+        return
+
+    if args.expire:
+        print(gc.expire_sources(dry_run=args.dry_run))
+    print(gc.collect(source_id, dry_run=args.dry_run))
+    if args.scan:
+        print(gc.scan(dry_run=args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,466 @@
+"""
+Local stand-ins for the Firecrawl, Groq and Pinecone HTTP APIs.
+
+Each fake speaks just enough of the real REST API for the SDKs used by the
+pipeline, and injects configurable latency and errors (HTTP 429 with
+``Retry-After`` or 503) so the pipeline can be load-tested offline.
+
+Usage:
+    with FakeServices(latency_ms=50, error_rate=0.01) as services:
+        os.environ.update(services.env())
+        pipeline = RAGPipeline()
+"""
+
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+WORDS = (
+    "agent crawl vector index query latency throughput embedding model token "
+    "document page site chunk retrieval answer context search cache server "
+    "request response batch stream worker budget schedule source namespace"
+).split()
+
+
+class FaultInjector:
+    """Adds latency (with jitter) and random 429/503 errors to fake responses."""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        seconds = max(0.0, self.latency_ms + jitter) / 1000.0
+        if seconds:
+            time.sleep(seconds)
+
+    def error(self):
+        """Return an HTTP status to fail with, or None."""
+        with self._lock:
+            if self.error_rate and self._random.random() < self.error_rate:
+                return self._random.choice((429, 503))
+        return None
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    """Base handler with JSON helpers and fault injection."""
+
+    protocol_version = "HTTP/1.1"
+    faults = FaultInjector()
+    state = None
+
+    def log_message(self, format, *args):
+        # Keep load-test output readable
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        return json.loads(body) if body else {}
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _inject(self):
+        """Apply latency and maybe answer with an error; returns True if handled."""
+        self.faults.delay()
+        status = self.faults.error()
+        if status is None:
+            return False
+        headers = {"Retry-After": "1"} if status == 429 else None
+        self._send_json(status, {"error": "injected failure"}, headers)
+        return True
+
+    def _route(self, method):
+        path = urlsplit(self.path).path
+        for route_method, pattern, handler in self.routes:
+            match = re.fullmatch(pattern, path)
+            if route_method == method and match:
+                if self._inject():
+                    return
+                return handler(self, *match.groups())
+        self._send_json(404, {"error": f"no route for {method} {path}"})
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def do_DELETE(self):
+        self._route("DELETE")
+
+
+# ----------------------------------------------------------------------
+# Groq (OpenAI-compatible chat completions)
+# ----------------------------------------------------------------------
+def _groq_completions(handler):
+    request = handler._read_json()
+    question = request.get("messages", [{}])[-1].get("content", "")
+    answer = f"Fake answer ({len(question)} prompt chars): " + " ".join(
+        random.choice(WORDS) for _ in range(40)
+    )
+
+    if not request.get("stream"):
+        handler._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:8]}",
+            "object": "chat.completion",
+            "model": request.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": answer},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(question) // 4, "completion_tokens": 60},
+        })
+        return
+
+    # Server-sent events, one word per chunk
+    handler.send_response(200)
+    handler.send_header("Content-Type", "text/event-stream")
+    handler.send_header("Connection", "close")
+    handler.end_headers()
+    for word in answer.split(" "):
+        chunk = {"choices": [{"index": 0, "delta": {"content": word + " "}}]}
+        handler.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        handler.wfile.flush()
+    handler.wfile.write(b"data: [DONE]\n\n")
+    handler.close_connection = True
+
+
+class FakeGroqHandler(_JSONHandler):
+    routes = [("POST", r".*/chat/completions", _groq_completions)]
+
+
+# ----------------------------------------------------------------------
+# Firecrawl (v1 and v2 scrape / crawl)
+# ----------------------------------------------------------------------
+class FirecrawlState:
+    def __init__(self, pages_per_crawl=10, words_per_page=600, page_latency_ms=0.0):
+        self.pages_per_crawl = pages_per_crawl
+        self.words_per_page = words_per_page
+        self.page_latency_ms = page_latency_ms
+        self.crawls = {}
+        self.lock = threading.Lock()
+
+    def page(self, url):
+        rng = random.Random(url)
+        paragraphs = []
+        remaining = self.words_per_page
+        while remaining > 0:
+            size = min(remaining, rng.randint(40, 120))
+            paragraphs.append(" ".join(rng.choice(WORDS) for _ in range(size)) + ".")
+            remaining -= size
+        return {
+            "markdown": f"# Page {url}\n\n" + "\n\n".join(paragraphs),
+            "metadata": {"sourceURL": url, "url": url, "title": f"Page {url}", "statusCode": 200},
+        }
+
+
+def _firecrawl_scrape(handler, version):
+    request = handler._read_json()
+    handler._send_json(200, {"success": True, "data": handler.state.page(request.get("url", ""))})
+
+
+def _firecrawl_start_crawl(handler, version):
+    request = handler._read_json()
+    crawl_id = uuid.uuid4().hex
+    root = request.get("url", "").rstrip("/")
+    limit = int(request.get("limit") or handler.state.pages_per_crawl)
+    pages = [root] + [f"{root}/page-{n}" for n in range(1, min(limit, handler.state.pages_per_crawl))]
+    with handler.state.lock:
+        handler.state.crawls[crawl_id] = {"pages": pages, "started": time.time(), "cancelled": False}
+    handler._send_json(200, {"success": True, "id": crawl_id, "url": f"/{version}/crawl/{crawl_id}"})
+
+
+def _firecrawl_crawl_status(handler, version, crawl_id):
+    crawl = handler.state.crawls.get(crawl_id)
+    if not crawl:
+        handler._send_json(404, {"success": False, "error": "unknown crawl"})
+        return
+    total = len(crawl["pages"])
+    per_page = handler.state.page_latency_ms / 1000.0
+    elapsed = time.time() - crawl["started"]
+    completed = total if not per_page else min(total, int(elapsed / per_page))
+    status = "cancelled" if crawl["cancelled"] else ("completed" if completed >= total else "scraping")
+    data = [handler.state.page(url) for url in crawl["pages"][:completed]] if status == "completed" else []
+    handler._send_json(200, {
+        "success": True, "status": status, "completed": completed, "total": total,
+        "creditsUsed": completed, "expiresAt": "2099-01-01T00:00:00Z", "next": None, "data": data,
+    })
+
+
+def _firecrawl_cancel_crawl(handler, version, crawl_id):
+    crawl = handler.state.crawls.get(crawl_id)
+    if crawl:
+        crawl["cancelled"] = True
+    handler._send_json(200, {"success": True, "status": "cancelled"})
+
+
+class FakeFirecrawlHandler(_JSONHandler):
+    routes = [
+        ("POST", r"/(v1|v2)/scrape", _firecrawl_scrape),
+        ("POST", r"/(v1|v2)/crawl", _firecrawl_start_crawl),
+        ("GET", r"/(v1|v2)/crawl/([\w-]+)", _firecrawl_crawl_status),
+        ("DELETE", r"/(v1|v2)/crawl/([\w-]+)", _firecrawl_cancel_crawl),
+    ]
+
+
+# ----------------------------------------------------------------------
+# Pinecone (control plane + data plane on one port)
+# ----------------------------------------------------------------------
+class PineconeState:
+    def __init__(self):
+        self.host = None
+        self.indexes = {}
+        self.namespaces = {}
+        self.lock = threading.Lock()
+
+    def describe(self, name, dimension=384):
+        return {
+            "name": name,
+            "dimension": dimension,
+            "metric": "cosine",
+            "host": self.host,
+            "spec": {"serverless": {"cloud": "aws", "region": "us-east-1"}},
+            "status": {"ready": True, "state": "Ready"},
+            "deletion_protection": "disabled",
+            "vector_type": "dense",
+        }
+
+
+def _matches_filter(metadata, flt):
+    """Evaluate the subset of Pinecone's metadata filter language we need."""
+    for key, condition in (flt or {}).items():
+        if key == "$and":
+            if not all(_matches_filter(metadata, sub) for sub in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(_matches_filter(metadata, sub) for sub in condition):
+                return False
+            continue
+        value = metadata.get(key)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for op, expected in condition.items():
+            if op == "$eq" and value != expected:
+                return False
+            if op == "$ne" and value == expected:
+                return False
+            if op == "$in" and value not in expected:
+                return False
+            if op == "$nin" and value in expected:
+                return False
+            if op in ("$gt", "$gte", "$lt", "$lte"):
+                if value is None:
+                    return False
+                if op == "$gt" and not value > expected:
+                    return False
+                if op == "$gte" and not value >= expected:
+                    return False
+                if op == "$lt" and not value < expected:
+                    return False
+                if op == "$lte" and not value <= expected:
+                    return False
+    return True
+
+
+def _cosine(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+def _pinecone_list_indexes(handler):
+    handler._send_json(200, {"indexes": list(handler.state.indexes.values())})
+
+
+def _pinecone_describe_index(handler, name):
+    index = handler.state.indexes.get(name)
+    if not index:
+        handler._send_json(404, {"error": {"code": "NOT_FOUND", "message": f"Index {name} not found"}})
+        return
+    handler._send_json(200, index)
+
+
+def _pinecone_create_index(handler):
+    request = handler._read_json()
+    index = handler.state.describe(request["name"], request.get("dimension", 384))
+    handler.state.indexes[request["name"]] = index
+    handler._send_json(201, index)
+
+
+def _pinecone_upsert(handler):
+    request = handler._read_json()
+    namespace = request.get("namespace", "")
+    with handler.state.lock:
+        store = handler.state.namespaces.setdefault(namespace, {})
+        for vector in request.get("vectors", []):
+            store[vector["id"]] = vector
+    handler._send_json(200, {"upsertedCount": len(request.get("vectors", []))})
+
+
+def _pinecone_query(handler):
+    request = handler._read_json()
+    namespace = request.get("namespace", "")
+    with handler.state.lock:
+        vectors = list(handler.state.namespaces.get(namespace, {}).values())
+    flt = request.get("filter")
+    scored = [
+        (_cosine(request.get("vector", []), v["values"]), v)
+        for v in vectors if _matches_filter(v.get("metadata") or {}, flt)
+    ]
+    scored.sort(key=lambda item: item[0], reverse=True)
+    matches = []
+    for score, vector in scored[: int(request.get("topK", 10))]:
+        match = {"id": vector["id"], "score": score}
+        if request.get("includeMetadata"):
+            match["metadata"] = vector.get("metadata") or {}
+        if request.get("includeValues"):
+            match["values"] = vector["values"]
+        matches.append(match)
+    handler._send_json(200, {"matches": matches, "namespace": namespace, "usage": {"readUnits": 1}})
+
+
+def _pinecone_delete(handler):
+    request = handler._read_json()
+    namespace = request.get("namespace", "")
+    with handler.state.lock:
+        store = handler.state.namespaces.get(namespace, {})
+        if request.get("deleteAll"):
+            store.clear()
+        for vector_id in request.get("ids") or []:
+            store.pop(vector_id, None)
+        if request.get("filter"):
+            for vector_id, vector in list(store.items()):
+                if _matches_filter(vector.get("metadata") or {}, request["filter"]):
+                    del store[vector_id]
+    handler._send_json(200, {})
+
+
+def _pinecone_fetch(handler):
+    query = parse_qs(urlsplit(handler.path).query)
+    namespace = query.get("namespace", [""])[0]
+    store = handler.state.namespaces.get(namespace, {})
+    vectors = {vid: store[vid] for vid in query.get("ids", []) if vid in store}
+    handler._send_json(200, {"vectors": vectors, "namespace": namespace, "usage": {"readUnits": 1}})
+
+
+def _pinecone_list_vectors(handler):
+    query = parse_qs(urlsplit(handler.path).query)
+    namespace = query.get("namespace", [""])[0]
+    prefix = query.get("prefix", [""])[0]
+    limit = int(query.get("limit", ["100"])[0])
+    start = int(query.get("paginationToken", ["0"])[0] or 0)
+    with handler.state.lock:
+        ids = sorted(vid for vid in handler.state.namespaces.get(namespace, {}) if vid.startswith(prefix))
+    page = ids[start:start + limit]
+    payload = {"vectors": [{"id": vid} for vid in page], "namespace": namespace, "usage": {"readUnits": 1}}
+    if start + limit < len(ids):
+        payload["pagination"] = {"next": str(start + limit)}
+    handler._send_json(200, payload)
+
+
+def _pinecone_stats(handler):
+    with handler.state.lock:
+        namespaces = {ns: {"vectorCount": len(store)} for ns, store in handler.state.namespaces.items()}
+    dimension = next(iter(handler.state.indexes.values()), {}).get("dimension", 384)
+    handler._send_json(200, {
+        "namespaces": namespaces,
+        "dimension": dimension,
+        "indexFullness": 0.0,
+        "totalVectorCount": sum(ns["vectorCount"] for ns in namespaces.values()),
+    })
+
+
+class FakePineconeHandler(_JSONHandler):
+    routes = [
+        ("GET", r"/indexes", _pinecone_list_indexes),
+        ("POST", r"/indexes", _pinecone_create_index),
+        ("GET", r"/indexes/([\w-]+)", _pinecone_describe_index),
+        ("POST", r"/vectors/upsert", _pinecone_upsert),
+        ("POST", r"/query", _pinecone_query),
+        ("POST", r"/vectors/delete", _pinecone_delete),
+        ("GET", r"/vectors/fetch", _pinecone_fetch),
+        ("GET", r"/vectors/list", _pinecone_list_vectors),
+        ("GET", r"/describe_index_stats", _pinecone_stats),
+        ("POST", r"/describe_index_stats", _pinecone_stats),
+    ]
+
+
+# ----------------------------------------------------------------------
+class FakeServices:
+    """
+    Start the three fakes on ephemeral localhost ports.
+
+    ``env()`` returns the environment variables that point the pipeline at
+    them; use as a context manager to stop the servers afterwards.
+    """
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0,
+                 pages_per_crawl=10, words_per_page=600, index_name="pavan", dimension=384):
+        self.faults = FaultInjector(latency_ms, jitter_ms, error_rate)
+        self.firecrawl_state = FirecrawlState(pages_per_crawl, words_per_page, page_latency_ms=latency_ms)
+        self.pinecone_state = PineconeState()
+        self.index_name = index_name
+        self.dimension = dimension
+        self._servers = []
+
+    def _serve(self, handler_base, state=None):
+        handler = type(handler_base.__name__, (handler_base,), {"faults": self.faults, "state": state})
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self._servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    def start(self):
+        self.groq_url = self._serve(FakeGroqHandler)
+        self.firecrawl_url = self._serve(FakeFirecrawlHandler, self.firecrawl_state)
+        self.pinecone_url = self._serve(FakePineconeHandler, self.pinecone_state)
+        self.pinecone_state.host = self.pinecone_url
+        self.pinecone_state.indexes[self.index_name] = self.pinecone_state.describe(self.index_name, self.dimension)
+        print(f"🧪 Fake services: groq={self.groq_url} firecrawl={self.firecrawl_url} pinecone={self.pinecone_url}")
+        return self
+
+    def env(self):
+        return {
+            "GROQ_API_KEY": "fake-groq-key",
+            "GROQ_API_URL": self.groq_url,
+            "FIRECRAWL_API_KEY": "fake-firecrawl-key",
+            "FIRECRAWL_API_URL": self.firecrawl_url,
+            "PINECONE_API_KEY": "fake-pinecone-key",
+            "PINECONE_ENVIRONMENT": "us-east-1",
+            "PINECONE_HOST": self.pinecone_url,
+            "EMBEDDING_DIMENSION": str(self.dimension),
+        }
+
+    def stop(self):
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        self._servers = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
@@ -0,0 +1,251 @@
+"""
+Concurrent-user load generator for ``RAGPipeline``.
+
+Simulated users share one pipeline and replay a mix of ``query`` and
+``process_website`` calls against the local fake services (or real ones, if
+the environment points at them). The report contains throughput, per-stage
+p50/p95/p99 latency and process resource usage.
+
+Example:
+    python -m src.loadtest.load_generator --users 20 --duration 60 \
+        --query-ratio 0.9 --latency-ms 80 --jitter-ms 40 --error-rate 0.02
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import tempfile
+import threading
+import time
+
+from src.utils.deadline import DEADLINE_MESSAGE
+from src.utils.metrics import stage_metrics
+from src.utils.rate_limiter import limiter_stats
+from src.utils.single_flight import coalescing_stats
+
+
+DEFAULT_QUESTIONS = [
+    "What is this site about?",
+    "How does the crawler handle rate limits?",
+    "Summarize the main features.",
+    "Which models are supported for embeddings?",
+    "What does the index store for each chunk?",
+    "How are sources kept up to date?",
+]
+
+# Answers the pipeline returns instead of raising when a query fails
+FAILED_ANSWERS = (
+    "Query processing failed.",
+    "Error generating text from Groq.",
+    DEADLINE_MESSAGE,
+)
+
+
+class ResourceSampler:
+    """Samples CPU utilisation, RSS and thread count in a background thread."""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+
+    @staticmethod
+    def _rss_mb():
+        try:
+            with open("/proc/self/statm") as f:
+                pages = int(f.read().split()[1])
+            return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+        except (OSError, ValueError):
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    def _run(self):
+        last_wall, last_cpu = time.monotonic(), time.process_time()
+        while not self._stop.wait(self.interval):
+            wall, cpu = time.monotonic(), time.process_time()
+            self.samples.append({
+                "cpu_percent": 100.0 * (cpu - last_cpu) / max(wall - last_wall, 1e-9),
+                "rss_mb": self._rss_mb(),
+                "threads": threading.active_count(),
+            })
+            last_wall, last_cpu = wall, cpu
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        if not self.samples:
+            return {}
+        return {
+            "cpu_percent_avg": sum(s["cpu_percent"] for s in self.samples) / len(self.samples),
+            "cpu_percent_max": max(s["cpu_percent"] for s in self.samples),
+            "rss_mb_max": max(s["rss_mb"] for s in self.samples),
+            "threads_max": max(s["threads"] for s in self.samples),
+        }
+
+
+class LoadGenerator:
+    """Drive a shared pipeline with ``users`` concurrent simulated users."""
+
+    def __init__(self, pipeline, users=10, duration=30.0, query_ratio=0.9, think_time=0.5,
+                 urls=None, questions=None, crawl_ratio=0.2, seed=None, unique_questions=False):
+        self.pipeline = pipeline
+        self.users = users
+        self.duration = duration
+        self.query_ratio = query_ratio
+        self.think_time = think_time
+        self.crawl_ratio = crawl_ratio
+        self.urls = urls or [f"https://site-{n}.example.com" for n in range(1, 6)]
+        self.questions = questions or DEFAULT_QUESTIONS
+        self.seed = seed
+        # Tag questions per user so concurrent users never coalesce
+        self.unique_questions = unique_questions
+        self._ingested = []
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    def _user(self, user_id, deadline):
+        rng = random.Random(None if self.seed is None else self.seed + user_id)
+        while time.monotonic() < deadline:
+            if rng.random() < self.query_ratio:
+                with self._lock:
+                    sources = [rng.choice(self._ingested)] if self._ingested and rng.random() < 0.5 else None
+                question = rng.choice(self.questions)
+                if self.unique_questions:
+                    question = f"{question} (user {user_id})"
+                with stage_metrics.timer("user.query") as timer:
+                    answer = self.pipeline.query(question, sources=sources)
+                    timer.ok = answer not in FAILED_ANSWERS
+            else:
+                url = rng.choice(self.urls)
+                mode = "crawl" if rng.random() < self.crawl_ratio else "scrape"
+                with stage_metrics.timer(f"user.ingest.{mode}") as timer:
+                    num_docs, _ = self.pipeline.process_website(url, mode=mode)
+                    timer.ok = num_docs > 0
+                if num_docs:
+                    with self._lock:
+                        self._ingested.append(url)
+            # Exponential think time between actions
+            if self.think_time:
+                time.sleep(min(rng.expovariate(1.0 / self.think_time), self.think_time * 5))
+
+    def warm(self):
+        """Ingest every URL once so that the first queries have content."""
+        for url in self.urls:
+            num_docs, _ = self.pipeline.process_website(url, mode="scrape")
+            if num_docs:
+                self._ingested.append(url)
+
+    def run(self):
+        stage_metrics.reset()
+        sampler = ResourceSampler()
+        sampler.start()
+        start = time.monotonic()
+        deadline = start + self.duration
+        threads = [
+            threading.Thread(target=self._user, args=(n, deadline), name=f"user-{n}", daemon=True)
+            for n in range(self.users)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - start
+
+        stages = stage_metrics.snapshot()
+        throughput = {
+            stage: stats["count"] / elapsed for stage, stats in stages.items() if stage.startswith("user.")
+        }
+        return {
+            "users": self.users,
+            "duration_s": elapsed,
+            "throughput_per_s": throughput,
+            "stages": stages,
+            "resources": sampler.stop(),
+            "coalescing": coalescing_stats(),
+            "rate_limits": limiter_stats(),
+        }
+
+
+def print_report(report):
+    print(f"\n📊 Load test: {report['users']} users for {report['duration_s']:.1f}s")
+    print("\nThroughput (ops/s):")
+    for stage, rate in report["throughput_per_s"].items():
+        print(f"   {stage:<24} {rate:8.2f}")
+    print("\nLatency per stage (ms):")
+    print(f"   {'stage':<24} {'count':>7} {'errors':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for stage, s in report["stages"].items():
+        print(f"   {stage:<24} {s['count']:>7} {s['errors']:>7} {s['p50_ms']:>9.1f} "
+              f"{s['p95_ms']:>9.1f} {s['p99_ms']:>9.1f} {s['max_ms']:>9.1f}")
+    print("\nCoalescing:")
+    for group, s in report["coalescing"].items():
+        print(f"   {group:<24} {s['calls']:>7} calls {s['executions']:>7} executed "
+              f"{s['coalescing_rate']:>8.1%} coalesced")
+    print("\nUpstream limits:")
+    for provider, s in report["rate_limits"].items():
+        print(f"   {provider:<24} {s['requests']:>7} requests {s['throttled']:>5} throttled "
+              f"limit {s['concurrency_limit']}, avg wait {s['avg_wait_ms']:.1f} ms")
+    print("\nResources:")
+    for key, value in report["resources"].items():
+        print(f"   {key:<24} {value:8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test RAGPipeline with concurrent simulated users.")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--query-ratio", type=float, default=0.9, help="share of actions that are queries")
+    parser.add_argument("--crawl-ratio", type=float, default=0.2, help="share of ingests that crawl")
+    parser.add_argument("--think-time", type=float, default=0.5, help="mean seconds between actions")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="fake upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=25.0, help="fake upstream latency jitter")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fake upstream 429/503 rate")
+    parser.add_argument("--pages-per-crawl", type=int, default=10)
+    parser.add_argument("--dimension", type=int, default=384, help="embedding dimension of the fake index")
+    parser.add_argument("--real-services", action="store_true", help="use the services configured in .env")
+    parser.add_argument("--json", dest="json_path", help="also write the report to this file")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--no-coalescing", action="store_true", help="disable single-flight coalescing")
+    parser.add_argument("--unique-questions", action="store_true",
+                        help="give every user its own questions so identical queries never overlap")
+    args = parser.parse_args()
+    if args.no_coalescing:
+        os.environ["RAG_SINGLE_FLIGHT"] = "0"
+
+    from src.loadtest.fake_services import FakeServices
+    from src.rag_pipeline import RAGPipeline
+
+    services = None
+    if not args.real_services:
+        services = FakeServices(
+            latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+            pages_per_crawl=args.pages_per_crawl, dimension=args.dimension,
+        ).start()
+        os.environ.update(services.env())
+        # Keep the fake run's side-stores away from the real ones
+        os.environ["RAG_STATE_DIR"] = tempfile.mkdtemp(prefix="rag-loadtest-")
+
+    try:
+        pipeline = RAGPipeline(namespace="loadtest", warmup="sync")
+        generator = LoadGenerator(
+            pipeline, users=args.users, duration=args.duration, query_ratio=args.query_ratio,
+            think_time=args.think_time, crawl_ratio=args.crawl_ratio, seed=args.seed,
+            unique_questions=args.unique_questions,
+        )
+        generator.warm()
+        report = generator.run()
+        print_report(report)
+        if args.json_path:
+            with open(args.json_path, "w") as f:
+                json.dump(report, f, indent=2)
+    finally:
+        if services:
+            services.stop()
+
+
+if __name__ == "__main__":
+    main()
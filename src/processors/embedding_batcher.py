@@ -0,0 +1,141 @@
+"""
+Dynamic micro-batching of query embeddings.
+
+Concurrent ``embed_query`` calls are queued and encoded together by one
+background thread: once a query arrives it collects more for at most
+``max_wait_ms`` (or until ``max_batch_size``) and runs a single batched
+forward pass. A lone caller therefore waits up to ``max_wait_ms`` extra
+(2 ms by default, ``0`` disables the wait), while callers arriving during a
+pass ride along in the next one.
+"""
+
+import os
+import queue
+import threading
+import time
+
+from langchain_core.embeddings import Embeddings
+
+from src.utils.metrics import stage_metrics
+
+
+class _Pending:
+    def __init__(self, text):
+        self.text = text
+        self.done = threading.Event()
+        self.vector = None
+        self.error = None
+
+
+class BatchingEmbeddings(Embeddings):
+    """
+    LangChain ``Embeddings`` wrapper that batches ``embed_query`` across threads.
+
+    Assumes ``embed_query(text) == embed_documents([text])[0]`` for the
+    wrapped model, which holds for ``HuggingFaceEmbeddings``. Other attributes
+    (e.g. ``client``) are delegated to the wrapped embeddings.
+
+    Args:
+        embeddings (Embeddings): The model to batch for.
+        max_wait_ms (float, optional): How long after the first query of a
+            batch to keep collecting more (``RAG_EMBED_BATCH_WAIT_MS``).
+        max_batch_size (int, optional): Largest batch per forward pass
+            (``RAG_EMBED_BATCH_SIZE``).
+    """
+
+    def __init__(self, embeddings, max_wait_ms=None, max_batch_size=None):
+        self.embeddings = embeddings
+        wait_ms = max_wait_ms if max_wait_ms is not None else float(os.getenv("RAG_EMBED_BATCH_WAIT_MS", "2"))
+        self.max_wait = wait_ms / 1000.0
+        self.max_batch_size = max_batch_size or int(os.getenv("RAG_EMBED_BATCH_SIZE", "32"))
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stats = {"queries": 0, "batches": 0, "max_batch": 0}
+
+    def __getattr__(self, name):
+        # Only called for attributes not found on the wrapper itself
+        embeddings = self.__dict__.get("embeddings")
+        if embeddings is None:
+            raise AttributeError(name)
+        return getattr(embeddings, name)
+
+    # ------------------------------------------------------------------
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text):
+        self._ensure_worker()
+        pending = _Pending(text)
+        self._queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.vector
+
+    # ------------------------------------------------------------------
+    def _ensure_worker(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="rag-embed-batcher", daemon=True)
+                    self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        # One window from the first query's arrival, not per straggler
+        closes_at = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = closes_at - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                with stage_metrics.timer("embed.query_batch"):
+                    vectors = self.embeddings.embed_documents([p.text for p in batch])
+                for pending, vector in zip(batch, vectors):
+                    pending.vector = vector
+            except Exception as e:
+                for pending in batch:
+                    pending.error = e
+            finally:
+                with self._lock:
+                    self._stats["queries"] += len(batch)
+                    self._stats["batches"] += 1
+                    self._stats["max_batch"] = max(self._stats["max_batch"], len(batch))
+                for pending in batch:
+                    pending.done.set()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["avg_batch"] = stats["queries"] / stats["batches"] if stats["batches"] else 0.0
+        stats["queued"] = self._queue.qsize()
+        return stats
+
+
+# One batcher (and one loaded model) per embedding model in the process
+_SHARED = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def shared_batching_embeddings(model_name, factory):
+    """Return the process-wide batcher for ``model_name``, building the model with ``factory()`` once."""
+    with _SHARED_LOCK:
+        batcher = _SHARED.get(model_name)
+        if batcher is None:
+            batcher = _SHARED[model_name] = BatchingEmbeddings(factory())
+        return batcher
+
+
+def embedding_batch_stats():
+    """Return ``{model_name: stats}`` for every shared batcher."""
+    with _SHARED_LOCK:
+        batchers = dict(_SHARED)
+    return {model_name: batcher.stats() for model_name, batcher in batchers.items()}
@@ -1,7 +1,13 @@
+import json
 import os
+import time
 import requests
 from dotenv import load_dotenv
 
+from src.utils.deadline import DEADLINE_MESSAGE, Deadline, DeadlineExceeded, latency_tracker
+from src.utils.metrics import stage_metrics
+from src.utils.rate_limiter import limited_call, rate_limit
+
 # Load environment variables
 load_dotenv()
 
@@ -20,6 +26,9 @@ class GroqProcessor:
         self.api_key = api_key or os.getenv("GROQ_API_KEY")
         self.api_url = api_url or os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1")
         self.model_name = model_name or os.getenv("GROQ_MODEL", "llama-3.1-70b-versatile")
+        # Faster model used when a request's deadline is nearly spent
+        self.fallback_model = os.getenv("GROQ_FALLBACK_MODEL") or None
+        self.fallback_budget = float(os.getenv("GROQ_FALLBACK_BUDGET_S", "5"))
 
         if not self.api_key:
             raise ValueError("GROQ_API_KEY not provided. Please set it in your .env file.")
@@ -40,15 +49,9 @@ class GroqProcessor:
             return self.api_url
         return f"{base}/{kind}"
 
-    # ----------------------------------------------------------------------
-    def generate_text(self, prompt, max_tokens=512, temperature=0.3):
-        """
-        Generate a text completion from Groq using OpenAI-compatible schema.
-        """
-        completions_url = self._build_url(kind="chat/completions")
-
-        payload = {
-            "model": self.model_name,
+    def _payload(self, prompt, max_tokens, temperature, model=None):
+        return {
+            "model": model or self.model_name,
             "messages": [
                 {"role": "system", "content": "You are a concise and factual assistant."},
                 {"role": "user", "content": prompt},
@@ -57,23 +60,128 @@ class GroqProcessor:
             "max_tokens": int(max_tokens),
         }
 
-        try:
-            resp = requests.post(completions_url, json=payload, headers=self._headers(), timeout=60)
-            if resp.status_code == 400:
-                print(f"❌ [Groq API Error 400] Response: {resp.text}")
-            resp.raise_for_status()
-            data = resp.json()
-
-            if isinstance(data, dict) and "choices" in data and data["choices"]:
-                msg = data["choices"][0].get("message", {})
-                if "content" in msg:
-                    print(f"🧠 [Groq Debug] Model output: {msg['content'][:200]}...")
-                    return msg["content"].strip()
-
-            return data.get("text", "⚠️ No response content returned.")
-        except requests.RequestException as e:
-            print(f"❌ Error calling Groq API: {e}")
-            return "Error generating text from Groq."
+    @staticmethod
+    def _token_estimate(prompt, max_tokens):
+        """Rough token cost of a request for the tokens/minute limit (~4 chars per token)."""
+        return len(prompt) // 4 + int(max_tokens)
+
+    # ----------------------------------------------------------------------
+    def model_for_budget(self, remaining):
+        """
+        Pick the model for a call with ``remaining`` seconds of budget.
+
+        Falls back to ``GROQ_FALLBACK_MODEL`` when the primary model's recent
+        p95 latency (or ``GROQ_FALLBACK_BUDGET_S`` before enough samples
+        exist) would not fit in what is left.
+        """
+        if remaining is None or not self.fallback_model:
+            return self.model_name
+        expected = latency_tracker.percentile(f"groq:{self.model_name}", 95, self.fallback_budget)
+        if remaining < expected:
+            print(f"⏱️ {remaining:.1f}s left, falling back to {self.fallback_model}")
+            return self.fallback_model
+        return self.model_name
+
+    def generate_text(self, prompt, max_tokens=512, temperature=0.3, timeout=None, model=None):
+        """
+        Generate a text completion from Groq using OpenAI-compatible schema.
+
+        ``timeout`` is the remaining budget in seconds (``None`` = the default
+        60s; ``0`` = already spent, nothing is sent); ``model`` overrides the
+        configured model for this call.
+        """
+        if timeout is not None and timeout <= 0:
+            print("⏱️ No time left for Groq generation.")
+            return DEADLINE_MESSAGE
+        deadline = Deadline(timeout)
+        completions_url = self._build_url(kind="chat/completions")
+        model = model or self.model_name
+        payload = self._payload(prompt, max_tokens, temperature, model=model)
+
+        with stage_metrics.timer("groq.generate") as timer:
+            try:
+                start = time.monotonic()
+
+                def post():
+                    # Time spent queued in the limiter comes out of the budget
+                    remaining = deadline.remaining()
+                    resp = requests.post(completions_url, json=payload, headers=self._headers(),
+                                         timeout=min(max(remaining, 0.01), 60) if remaining is not None else 60)
+                    if resp.status_code == 400:
+                        print(f"❌ [Groq API Error 400] Response: {resp.text}")
+                    resp.raise_for_status()
+                    return resp
+
+                # Throttled calls are retried by the limiter unless a deadline is running
+                resp = limited_call("groq", post, tokens=self._token_estimate(prompt, max_tokens),
+                                    retries=0 if timeout is not None else None, deadline=deadline)
+                data = resp.json()
+                latency_tracker.record(f"groq:{model}", time.monotonic() - start)
+
+                if isinstance(data, dict) and "choices" in data and data["choices"]:
+                    msg = data["choices"][0].get("message", {})
+                    if "content" in msg:
+                        print(f"🧠 [Groq Debug] Model output: {msg['content'][:200]}...")
+                        return msg["content"].strip()
+
+                return data.get("text", "⚠️ No response content returned.")
+            except (requests.Timeout, DeadlineExceeded) as e:
+                timer.ok = False
+                print(f"⏱️ Groq API timed out: {e}")
+                return DEADLINE_MESSAGE
+            except requests.RequestException as e:
+                timer.ok = False
+                print(f"❌ Error calling Groq API: {e}")
+                return "Error generating text from Groq."
+
+    # ----------------------------------------------------------------------
+    def stream_text(self, prompt, max_tokens=512, temperature=0.3, model=None, timeout=None):
+        """
+        Stream a completion from Groq, yielding text deltas as they arrive
+        (OpenAI-compatible server-sent events).
+
+        ``timeout`` is the remaining budget in seconds for the whole stream;
+        once it runs out the stream is cut short.
+        """
+        if timeout is not None and timeout <= 0:
+            print("⏱️ No time left for Groq generation.")
+            yield DEADLINE_MESSAGE
+            return
+        deadline = Deadline(timeout)
+        completions_url = self._build_url(kind="chat/completions")
+        payload = self._payload(prompt, max_tokens, temperature, model=model)
+        payload["stream"] = True
+
+        with stage_metrics.timer("groq.stream") as timer:
+            try:
+                with rate_limit("groq", tokens=self._token_estimate(prompt, max_tokens), deadline=deadline), \
+                        requests.post(completions_url, json=payload, headers=self._headers(),
+                                      timeout=min(max(deadline.remaining(), 0.01), 60) if timeout is not None else 60,
+                                      stream=True) as resp:
+                    resp.raise_for_status()
+                    for line in resp.iter_lines(decode_unicode=True):
+                        if deadline.expired:
+                            timer.ok = False
+                            print("⏱️ Groq stream cut short by the deadline.")
+                            yield " …(answer cut short: out of time)"
+                            break
+                        if not line or not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            break
+                        choices = json.loads(data).get("choices") or [{}]
+                        delta = choices[0].get("delta", {}).get("content")
+                        if delta:
+                            yield delta
+            except (requests.Timeout, DeadlineExceeded) as e:
+                timer.ok = False
+                print(f"⏱️ Groq stream timed out: {e}")
+                yield DEADLINE_MESSAGE
+            except (requests.RequestException, ValueError) as e:
+                timer.ok = False
+                print(f"❌ Error streaming from Groq API: {e}")
+                yield "Error generating text from Groq."
 
     # ----------------------------------------------------------------------
     def get_embedding(self, text):
@@ -6,9 +6,10 @@ https://router.huggingface.co/hf-inference/models/<model>
 """
 
 import os
-import time
 import requests
 
+from src.utils.rate_limiter import limited_call
+
 
 class HFEmbedder:
     def __init__(self, model_name=None, api_key=None):
@@ -29,21 +30,28 @@ class HFEmbedder:
             "Content-Type": "application/json",
         }
 
+    @staticmethod
+    def _transient(error):
+        """Connection errors, timeouts and 5xx responses are worth another try."""
+        if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return True
+        response = getattr(error, "response", None)
+        return response is not None and response.status_code >= 500
+
     def _post(self, payload, max_retries=3):
-        """POST with retry logic."""
+        """POST through the shared Hugging Face limiter, retrying throttled and transient failures."""
         url = self._hf_url()
-        for attempt in range(1, max_retries + 1):
-            try:
-                resp = requests.post(url, json=payload, headers=self._headers(), timeout=60)
-                resp.raise_for_status()
-                return resp.json()
-            except requests.RequestException as e:
-                print(f"⚠️ HF API request failed (attempt {attempt}/{max_retries}): {e}")
-                if attempt < max_retries:
-                    time.sleep(2 * attempt)
-                else:
-                    print("❌ HF API permanently failed after 3 attempts.")
-                    return None
+
+        def post():
+            resp = requests.post(url, json=payload, headers=self._headers(), timeout=60)
+            resp.raise_for_status()
+            return resp.json()
+
+        try:
+            return limited_call("huggingface", post, retries=max_retries - 1, retry_on=self._transient)
+        except requests.RequestException as e:
+            print(f"❌ HF API request failed: {e}")
+            return None
 
     # ------------------------------------------------------------------
     def get_embedding(self, text):
@@ -0,0 +1,129 @@
+"""
+Token-aware text splitting sized to the embedding model's sequence limit.
+
+Chunks are measured in tokens of the model's own tokenizer so that they
+fill, but never exceed, the model's ``max_seq_length`` (sentence-transformers
+silently truncate anything longer). Overlap is either a token count or a
+number of whole trailing sentences from the previous chunk.
+"""
+
+import os
+import re
+import threading
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+class TokenAwareTextSplitter:
+    """
+    Split documents into chunks of at most ``chunk_tokens`` model tokens.
+
+    Args:
+        tokenizer: Hugging Face tokenizer of the embedding model.
+        max_seq_length (int): Model sequence limit, including special tokens.
+        chunk_tokens (int, optional): Target chunk size; defaults to the full
+            usable sequence length (``RAG_CHUNK_TOKENS``).
+        overlap_tokens (int, optional): Token overlap, or the overlap budget
+            in sentence mode (``RAG_CHUNK_OVERLAP_TOKENS``).
+        overlap_mode (str, optional): ``"tokens"``, ``"sentences"`` or
+            ``"none"`` (``RAG_CHUNK_OVERLAP_MODE``).
+        overlap_sentences (int, optional): Trailing sentences carried over in
+            sentence mode (``RAG_CHUNK_OVERLAP_SENTENCES``).
+    """
+
+    def __init__(self, tokenizer, max_seq_length, chunk_tokens=None, overlap_tokens=None,
+                 overlap_mode=None, overlap_sentences=None):
+        self.tokenizer = tokenizer
+        special = tokenizer.num_special_tokens_to_add() if hasattr(tokenizer, "num_special_tokens_to_add") else 2
+        self.max_tokens = max_seq_length - special
+
+        chunk_tokens = chunk_tokens or int(os.getenv("RAG_CHUNK_TOKENS", "0")) or self.max_tokens
+        self.chunk_tokens = min(chunk_tokens, self.max_tokens)
+        self.overlap_mode = overlap_mode or os.getenv("RAG_CHUNK_OVERLAP_MODE", "sentences")
+        overlap_tokens = overlap_tokens if overlap_tokens is not None else int(os.getenv("RAG_CHUNK_OVERLAP_TOKENS", "24"))
+        self.overlap_tokens = 0 if self.overlap_mode == "none" else min(overlap_tokens, self.chunk_tokens // 2)
+        self.overlap_sentences = overlap_sentences or int(os.getenv("RAG_CHUNK_OVERLAP_SENTENCES", "1"))
+
+        # In sentence mode the overlap budget is reserved inside each chunk
+        if self.overlap_mode == "sentences":
+            base_size, base_overlap = self.chunk_tokens - self.overlap_tokens, 0
+        else:
+            base_size, base_overlap = self.chunk_tokens, self.overlap_tokens
+        self._splitter = RecursiveCharacterTextSplitter.from_huggingface_tokenizer(
+            tokenizer, chunk_size=base_size, chunk_overlap=base_overlap
+        )
+
+        self._lock = threading.Lock()
+        self.stats = {"documents": 0, "chunks": 0, "tokens": 0, "truncated_chunks": 0, "truncated_tokens": 0}
+        print(
+            f"✂️ Token-aware splitter: {self.chunk_tokens} tokens/chunk (model limit {self.max_tokens}), "
+            f"overlap {self.overlap_tokens} tokens ({self.overlap_mode})"
+        )
+
+    # ------------------------------------------------------------------
+    def count_tokens(self, text):
+        return len(self.tokenizer.tokenize(text))
+
+    def _with_sentence_overlap(self, pieces):
+        """Prepend whole trailing sentences of the previous piece within the overlap budget."""
+        chunks = []
+        for i, piece in enumerate(pieces):
+            if i == 0 or not self.overlap_tokens:
+                chunks.append(piece)
+                continue
+            carried, budget = [], self.overlap_tokens
+            for sentence in reversed(SENTENCE_END.split(pieces[i - 1])[-self.overlap_sentences:]):
+                cost = self.count_tokens(sentence)
+                if cost > budget:
+                    break
+                carried.insert(0, sentence)
+                budget -= cost
+            chunks.append(" ".join(carried + [piece]) if carried else piece)
+        return chunks
+
+    def split_text(self, text):
+        pieces = self._splitter.split_text(text)
+        if self.overlap_mode == "sentences":
+            pieces = self._with_sentence_overlap(pieces)
+        return pieces
+
+    def split_documents(self, documents):
+        """Split documents, copying each document's metadata onto its chunks."""
+        chunks, tokens, truncated, truncated_tokens = [], 0, 0, 0
+        for document in documents:
+            for text in self.split_text(document.page_content):
+                count = self.count_tokens(text)
+                tokens += count
+                if count > self.max_tokens:
+                    truncated += 1
+                    truncated_tokens += count - self.max_tokens
+                chunks.append(Document(page_content=text, metadata=dict(document.metadata)))
+
+        with self._lock:
+            self.stats["documents"] += len(documents)
+            self.stats["chunks"] += len(chunks)
+            self.stats["tokens"] += tokens
+            self.stats["truncated_chunks"] += truncated
+            self.stats["truncated_tokens"] += truncated_tokens
+
+        if chunks:
+            utilization = tokens / (len(chunks) * self.max_tokens)
+            print(
+                f"📏 {len(chunks)} chunks, avg {tokens / len(chunks):.0f} tokens "
+                f"({utilization:.0%} of model limit), {truncated} would be truncated"
+            )
+        return chunks
+
+    def report(self):
+        """Cumulative chunking and truncation stats."""
+        with self._lock:
+            stats = dict(self.stats)
+        chunks = stats["chunks"] or 1
+        stats["avg_tokens"] = stats["tokens"] / chunks
+        stats["utilization"] = stats["tokens"] / (chunks * self.max_tokens)
+        stats["truncated_ratio"] = stats["truncated_chunks"] / chunks
+        return stats
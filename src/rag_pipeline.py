@@ -1,13 +1,31 @@
+import hashlib
 import os
+import threading
+import time
+from contextlib import contextmanager
 from dotenv import load_dotenv
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.embeddings import HuggingFaceEmbeddings
 
+from src.utils.deadline import DEADLINE_MESSAGE, Deadline, DeadlineExceeded
+from src.utils.metrics import stage_metrics
+from src.utils.rate_limiter import BULK, limiter_stats, request_priority
+from src.utils.single_flight import coalescing_stats, single_flight
+from src.utils.url_utils import normalize_url, source_id_for_url
 
 # Load environment variables
 load_dotenv()
 
 
+def namespace_for_source(namespace, source_id, routing="filter"):
+    """Namespace holding ``source_id``'s chunks under the given routing mode."""
+    if routing == "namespace":
+        return f"{namespace}-{source_id}"
+    return namespace
+
+
+class IngestionCancelled(Exception):
+    """Raised by ``RAGPipeline.process_website`` when ingestion is cancelled."""
+
+
 class RAGPipeline:
     """
     RAG pipeline using:
@@ -15,85 +33,406 @@ class RAGPipeline:
     - Hugging Face embeddings (via LangChain)
     - Pinecone for vector DB
     - Groq for generation
+
+    Heavy components (embedding model, Pinecone vector store, text splitter)
+    are built lazily on first use; call ``warm_up()`` to build them ahead of
+    time, optionally in a background thread.
     """
 
     def __init__(
         self,
-        index_name="pavan",
-        namespace="default",
+        index_name=None,
+        namespace=None,
         groq_api_key=None,
         pinecone_api_key=None,
         pinecone_environment=None,
         firecrawl_api_key=None,
+        warmup=None,
     ):
         print("🔧 Initializing RAG pipeline...")
+        from src.database.active_index import load_active_index
 
-        # --- Lazy imports to avoid circular dependency ---
-        from src.scrapers.firecrawl_scraper import FirecrawlWebScraper
-        from src.database.pinecone_db import PineconeDatabase
-        from src.processors.groq_processor import GroqProcessor
-
-        # --- Core components ---
-        self.scraper = FirecrawlWebScraper(api_key=firecrawl_api_key)
-        self.db = PineconeDatabase(
-            index_name=index_name,
-            namespace=namespace,
-            api_key=pinecone_api_key,
-            environment=pinecone_environment,
+        # Explicit arguments win; otherwise use the target the last index
+        # migration switched to (see src/database/corpus_migrate.py).
+        active = load_active_index()
+        index_name = index_name or active.get("index_name") or "pavan"
+        namespace = namespace or active.get("namespace") or "default"
+        self.index_name = index_name
+        self.namespace = namespace
+        self.chunking = active.get("chunking") or {}
+        # "filter": one shared namespace, sources selected by metadata filter.
+        # "namespace": one namespace per source, queries routed to them.
+        self.source_routing = os.getenv("RAG_SOURCE_ROUTING", "filter")
+        self.model_name = active.get("model") or os.getenv(
+            "HUGGINGFACE_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2"
         )
-        self.processor = GroqProcessor(api_key=groq_api_key)
 
+        # Seconds spent per import / component, see ``startup_report()``.
+        self.startup_timings = {}
+        self._components = {}
+        self._component_locks = {
+            name: threading.Lock() for name in ("embedder", "vector_store", "text_splitter", "document_store", "corpus_store", "vector_gc")
+        }
+        self._warmup_thread = None
+
+        # --- Lazy imports to avoid circular dependency ---
+        with self._timed("import:src components"):
+            from src.scrapers.firecrawl_scraper import FirecrawlWebScraper
+            from src.database.pinecone_db import PineconeDatabase
+            from src.processors.groq_processor import GroqProcessor
+
+        # --- Core components (cheap: they only validate configuration) ---
+        with self._timed("component:scraper"):
+            self.scraper = FirecrawlWebScraper(api_key=firecrawl_api_key)
+        with self._timed("component:db"):
+            self.db = PineconeDatabase(
+                index_name=index_name,
+                namespace=namespace,
+                api_key=pinecone_api_key,
+                environment=pinecone_environment,
+            )
+        with self._timed("component:processor"):
+            self.processor = GroqProcessor(api_key=groq_api_key)
+
+        print("✅ RAG pipeline initialized (heavy components load on first use).")
+
+        warmup = warmup if warmup is not None else os.getenv("RAG_WARMUP", "off")
+        if warmup in ("background", "sync"):
+            self.warm_up(background=(warmup == "background"))
+
+    # ------------------------------------------------------------------
+    @contextmanager
+    def _timed(self, label):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.startup_timings[label] = time.perf_counter() - start
+
+    def _component(self, name, factory):
+        """Return a lazily built component, building it at most once."""
+        component = self._components.get(name)
+        if component is not None:
+            return component
+        with self._component_locks[name]:
+            if name not in self._components:
+                self._components[name] = factory()
+            return self._components[name]
+
+    # ------------------------------------------------------------------
+    @property
+    def embedder(self):
+        return self._component("embedder", self._build_embedder)
+
+    @property
+    def vector_store(self):
+        return self._component("vector_store", self._build_vector_store)
+
+    @property
+    def text_splitter(self):
+        return self._component("text_splitter", self._build_text_splitter)
+
+    @property
+    def document_store(self):
+        return self._component("document_store", self._build_document_store)
+
+    def _build_document_store(self):
+        # --- Local side-store for full document metadata ---
+        from src.database.document_store import DocumentStore
+
+        with self._timed("component:document_store"):
+            return DocumentStore()
+
+    @property
+    def corpus_store(self):
+        """Local append-only corpus, or None when ``RAG_CORPUS_ENABLED=0``."""
+        if os.getenv("RAG_CORPUS_ENABLED", "1") == "0":
+            return None
+        return self._component("corpus_store", self._build_corpus_store)
+
+    def _build_corpus_store(self):
+        # --- Local corpus of documents and chunks for offline re-embedding ---
+        from src.database.corpus_store import CorpusStore
+
+        with self._timed("component:corpus_store"):
+            return CorpusStore()
+
+    @property
+    def vector_gc(self):
+        return self._component("vector_gc", self._build_vector_gc)
+
+    def _build_vector_gc(self):
+        # --- Deletes vectors orphaned by re-ingests and expired sources ---
+        from src.database.vector_gc import VectorGC
+
+        return VectorGC(self.db, self.document_store, self.corpus_store)
+
+    def _build_embedder(self):
         # --- Hugging Face embeddings (LangChain native) ---
-        model_name = os.getenv("HUGGINGFACE_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
-        print(f"🧠 Using Hugging Face embeddings: {model_name}")
-        self.embedder = HuggingFaceEmbeddings(model_name=model_name)
+        with self._timed("import:langchain_community.embeddings"):
+            from langchain_community.embeddings import HuggingFaceEmbeddings
+        print(f"🧠 Using Hugging Face embeddings: {self.model_name}")
+        with self._timed("component:embedder"):
+            if os.getenv("RAG_EMBED_BATCHING", "1") == "0":
+                return HuggingFaceEmbeddings(model_name=self.model_name)
+            # Shared across pipelines so concurrent queries batch on one model
+            from src.processors.embedding_batcher import shared_batching_embeddings
+
+            return shared_batching_embeddings(
+                self.model_name, lambda: HuggingFaceEmbeddings(model_name=self.model_name)
+            )
 
+    def _build_vector_store(self):
         # --- Pinecone vector store ---
-        self.vector_store = self.db.create_vector_store(self.embedder)
-        if not self.vector_store:
+        embedder = self.embedder
+        with self._timed("component:vector_store"):
+            vector_store = self.db.create_vector_store(embedder)
+        if not vector_store:
             raise RuntimeError("❌ Failed to initialize Pinecone vector store.")
-        print(f"✅ Connected to Pinecone index: {index_name}")
+        print(f"✅ Connected to Pinecone index: {self.index_name}")
+        return vector_store
 
-        # --- Text splitter ---
-        self.text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=100)
+    def _build_text_splitter(self):
+        # --- Text splitter (sized in tokens of the embedding model) ---
+        with self._timed("import:langchain_text_splitters"):
+            from langchain_text_splitters import RecursiveCharacterTextSplitter
+            from src.processors.text_chunker import TokenAwareTextSplitter
 
-        print("✅ RAG pipeline initialized successfully!")
+        model = getattr(self.embedder, "client", None)
+        with self._timed("component:text_splitter"):
+            try:
+                return TokenAwareTextSplitter(model.tokenizer, model.max_seq_length, **self.chunking)
+            except Exception as e:
+                print(f"⚠️ Token-aware splitter unavailable ({e}); falling back to character chunks.")
+                return RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=100)
+
+    def chunking_stats(self):
+        """Cumulative chunk size and truncation stats of the token-aware splitter."""
+        splitter = self._components.get("text_splitter")
+        return splitter.report() if hasattr(splitter, "report") else {}
 
     # ------------------------------------------------------------------
-    def process_website(self, url, mode="scrape"):
-        """Scrape or crawl a website, split, embed, and store in Pinecone."""
+    def namespace_for_source(self, source_id):
+        """Namespace that holds the chunks of ``source_id``."""
+        return namespace_for_source(self.namespace, source_id, self.source_routing)
+
+    # ------------------------------------------------------------------
+    def warm_up(self, background=True):
+        """
+        Build the embedding model, vector store and splitter ahead of the
+        first request, including a dummy encode to page in the model weights.
+
+        Returns the warm-up thread when ``background`` is True.
+        """
+        if background:
+            if self._warmup_thread is None or not self._warmup_thread.is_alive():
+                self._warmup_thread = threading.Thread(
+                    target=self._warm_up, name="rag-warmup", daemon=True
+                )
+                self._warmup_thread.start()
+            return self._warmup_thread
+        self._warm_up()
+        return None
+
+    def _warm_up(self):
+        try:
+            embedder = self.embedder
+            with self._timed("warmup:dummy_encode"):
+                embedder.embed_query("warm-up")
+            self.text_splitter
+            self.vector_store
+            print("🔥 RAG pipeline warm-up complete.")
+        except Exception as e:
+            print(f"⚠️ RAG pipeline warm-up failed: {e}")
+
+    @staticmethod
+    def embedding_batch_stats():
+        """Query-embedding batch sizes per shared model."""
+        from src.processors.embedding_batcher import embedding_batch_stats
+
+        return embedding_batch_stats()
+
+    @staticmethod
+    def rate_limit_stats():
+        """Concurrency limit, in-flight requests and queue depth per upstream provider."""
+        return limiter_stats()
+
+    @staticmethod
+    def coalescing_stats():
+        """Process-wide single-flight stats for queries and ingests."""
+        return coalescing_stats()
+
+    def startup_report(self):
+        """Print and return the seconds spent on each import and component."""
+        report = dict(sorted(self.startup_timings.items(), key=lambda kv: kv[1], reverse=True))
+        print("⏱️ Startup timings:")
+        for label, seconds in report.items():
+            print(f"   {label:<45} {seconds * 1000:9.1f} ms")
+        return report
+
+    # ------------------------------------------------------------------
+    def process_website(self, url, mode="scrape", progress_callback=None, cancel_event=None,
+                        source_url=None, summarize=True):
+        """
+        Scrape or crawl a website, split, embed, and store in Pinecone.
+
+        ``progress_callback`` (if given) is called with keyword arguments
+        describing the current stage and counters; setting ``cancel_event``
+        stops the ingestion at the next checkpoint with ``IngestionCancelled``.
+        ``source_url`` files the pages under an already ingested source (used
+        when re-scraping single pages of a crawled site); ``summarize=False``
+        skips the Groq summary.
+
+        Identical concurrent ingests (same normalized URL, mode, target index
+        and credentials) share one execution; callers that join an ingest
+        already in flight get its result but not its progress updates. If
+        the running ingest is cancelled, the callers waiting on it run their
+        own instead.
+        """
+        key = (self._credentials_id(), self.db.index_name, self.namespace, normalize_url(url), mode,
+               normalize_url(source_url) if source_url else None, summarize)
+
+        def run():
+            # Upstream calls made for ingestion queue behind interactive queries
+            with request_priority(BULK):
+                return self._process_website(url, mode, progress_callback, cancel_event, source_url, summarize)
+
+        return single_flight("ingest").do(key, run, rerun_on=(IngestionCancelled,), cancel_event=cancel_event)
+
+    def _credentials_id(self):
+        """Short hash of the API keys, so coalescing never crosses accounts."""
+        keys = "|".join(str(key) for key in (self.scraper.api_key, self.db.api_key, self.processor.api_key))
+        return hashlib.sha1(keys.encode("utf-8")).hexdigest()[:16]
+
+    def _process_website(self, url, mode, progress_callback, cancel_event, source_url, summarize):
         print(f"🌐 Processing {url} in {mode.upper()} mode...")
+        source_id = source_id_for_url(source_url or url)
+        namespace = self.namespace_for_source(source_id)
+
+        def report(**progress):
+            if progress_callback:
+                progress_callback(**progress)
+
+        def check_cancelled():
+            if cancel_event is not None and cancel_event.is_set():
+                print(f"🛑 Ingestion of {url} cancelled.")
+                raise IngestionCancelled(url)
 
         # Crawl or scrape
+        check_cancelled()
+        report(stage="scraping", pages_scraped=0)
         documents = (
-            self.scraper.crawl_website(url)
+            self.scraper.crawl_website(url, progress_callback=progress_callback, cancel_event=cancel_event)
             if mode == "crawl"
             else self.scraper.scrape_website(url)
         )
+        check_cancelled()
 
         if not documents:
             print("⚠️ No documents retrieved.")
             return 0, "No content."
 
+        # Keep full metadata once in the side-store, only compact fields on chunks
+        report(stage="splitting", pages_scraped=len(documents))
+        known_source = self.document_store.get_source(source_id)
+        # Only an ingest covering the whole source replaces its live chunk set;
+        # a scrape of a crawled site's URL refreshes that one page, like a
+        # scheduler re-scrape under ``source_url``.
+        full_ingest = source_url is None and (
+            mode == "crawl" or known_source is None or known_source["mode"] != "crawl"
+        )
+        archived = self._store_documents(url, mode, source_id, documents, record_source=full_ingest)
+
         # Split into chunks
-        chunks = self.text_splitter.split_documents(documents)
+        with stage_metrics.timer("pipeline.split"):
+            chunks = self.text_splitter.split_documents(documents)
+        ordinals = {}
+        ids = []
+        for chunk in chunks:
+            doc_id = chunk.metadata["doc_id"]
+            ordinals[doc_id] = ordinals.get(doc_id, -1) + 1
+            chunk.metadata["chunk"] = ordinals[doc_id]
+            ids.append(f"{doc_id}:{ordinals[doc_id]}")
         print(f"🧩 Split {len(documents)} docs into {len(chunks)} chunks")
 
+        # Keep a local copy so re-embedding never needs a re-crawl
+        if self.corpus_store is not None:
+            self.corpus_store.append_ingest(
+                source_id, archived,
+                [(c.metadata["doc_id"], c.metadata["chunk"], c.page_content) for c in chunks],
+            )
+
         # Add to Pinecone
+        batch_size = 50
+        total_batches = (len(chunks) + batch_size - 1) // batch_size
         total_added = 0
-        for i in range(0, len(chunks), 50):
-            batch = chunks[i:i+50]
+        report(stage="embedding", chunks_total=len(chunks), chunks_embedded=0,
+               batches_total=total_batches, batches_upserted=0)
+        for i in range(0, len(chunks), batch_size):
+            check_cancelled()
+            batch = chunks[i:i+batch_size]
             try:
-                ids = self.db.add_documents(self.vector_store, batch)
-                total_added += len(ids)
-                print(f"✅ Added batch {i//50 + 1}: {len(ids)} docs")
+                added = self.db.add_documents(
+                    self.vector_store, batch, namespace=namespace, ids=ids[i:i+batch_size]
+                )
+                total_added += len(added)
+                print(f"✅ Added batch {i//batch_size + 1}: {len(added)} docs")
             except Exception as e:
-                print(f"❌ Error adding batch {i//50 + 1}: {e}")
+                print(f"❌ Error adding batch {i//batch_size + 1}: {e}")
+            report(stage="embedding", chunks_embedded=min(i + batch_size, len(chunks)),
+                   batches_upserted=i//batch_size + 1)
+
+        # Only a complete ingest defines the live chunk set; old vectors of a
+        # partial one are kept until the next successful run.
+        if chunks and total_added == len(chunks):
+            gc_on_ingest = os.getenv("RAG_GC_ON_INGEST", "1") != "0"
+            if gc_on_ingest and known_source:
+                try:
+                    # Chunks of a source ingested before the ledger existed
+                    self.vector_gc.seed_source(source_id)
+                except Exception as e:
+                    print(f"⚠️ Could not look up untracked vectors: {e}")
+            self.document_store.record_chunks(self.db.index_name, source_id, namespace,
+                                              {doc_id: last + 1 for doc_id, last in ordinals.items()},
+                                              replace_source=full_ingest)
+            if gc_on_ingest:
+                try:
+                    self.vector_gc.collect(source_id)
+                except Exception as e:
+                    print(f"⚠️ Stale vector cleanup failed: {e}")
 
         # Summarize
+        check_cancelled()
+        if not summarize:
+            return total_added, None
+        report(stage="summarizing")
         summary = self.generate_content_summary(documents)
         return total_added, summary
 
+    # ------------------------------------------------------------------
+    def _store_documents(self, url, mode, source_id, documents, record_source=True):
+        """
+        Write full page metadata to the side-store and replace each
+        document's metadata with the compact fields copied onto its chunks.
+
+        Returns ``(doc_id, text, full_metadata)`` tuples for the corpus store.
+        """
+        from src.database.document_store import DocumentStore
+
+        rows, archived = [], []
+        for document in documents:
+            page_url = DocumentStore.document_url(document.metadata) or url
+            doc_id = DocumentStore.make_doc_id(page_url, source_id)
+            rows.append((doc_id, page_url, document.metadata,
+                         DocumentStore.content_hash(document.page_content)))
+            archived.append((doc_id, document.page_content, document.metadata))
+            document.metadata = {"doc_id": doc_id, "source_id": source_id}
+
+        self.document_store.put_documents(source_id, rows)
+        if record_source:
+            self.document_store.record_source(source_id, url, mode, len(documents))
+        return archived
+
     # ------------------------------------------------------------------
     def generate_content_summary(self, documents):
         """Summarize using Groq LLM."""
@@ -113,16 +452,49 @@ CONTENT:
             return "Summary generation failed."
 
     # ------------------------------------------------------------------
-    def query(self, query_text, k=4):
-        """Query Pinecone and generate answer via Groq."""
-        try:
-            print(f"🔎 Querying knowledge base for: {query_text}")
-            results = self.db.similarity_search(self.vector_store, query_text, k=k)
-            if not results:
-                return "No relevant info found."
+    def retrieve(self, query_text, k=4, sources=None, hydrate=False, deadline=None):
+        """
+        Return the ``k`` chunks most similar to ``query_text``.
 
-            context = "\n\n".join([d.page_content for d in results])[:12000]
-            prompt = f"""
+        ``sources`` optionally restricts retrieval to chunks ingested from
+        the given source URLs (as passed to ``process_website``). With
+        ``hydrate=True`` the full page metadata is joined back from the
+        document side-store. ``deadline`` bounds the (hedged) Pinecone calls.
+        """
+        results = self._search(query_text, k=k, sources=sources, deadline=deadline)
+        if hydrate and results:
+            metadata = self.document_store.get_metadata(
+                d.metadata.get("doc_id") for d in results if d.metadata.get("doc_id")
+            )
+            for d in results:
+                d.metadata = {**metadata.get(d.metadata.get("doc_id"), {}), **d.metadata}
+        return results
+
+    def _search(self, query_text, k=4, sources=None, deadline=None):
+        source_ids = sorted({source_id_for_url(source) for source in sources or ()})
+        search_filter = {"source_id": {"$in": source_ids}} if source_ids else None
+
+        if self.source_routing == "namespace":
+            # The base namespace still holds chunks written under filter
+            # routing; unscoped queries fan out to every source's namespace
+            if source_ids:
+                namespaces = [self.namespace_for_source(sid) for sid in source_ids]
+            else:
+                self.vector_store  # make sure the index handle exists
+                namespaces = self.db.list_namespaces(prefix=f"{self.namespace}-")
+            return self.db.similarity_search_namespaces(
+                self.vector_store, query_text, [self.namespace, *namespaces], k=k,
+                filter=search_filter, deadline=deadline,
+            )
+
+        return self.db.similarity_search(
+            self.vector_store, query_text, k=k, filter=search_filter, deadline=deadline
+        )
+
+    # ------------------------------------------------------------------
+    def _answer_prompt(self, query_text, results):
+        context = "\n\n".join([d.page_content for d in results])[:12000]
+        return f"""
 Use ONLY the following context to answer:
 
 CONTEXT:
@@ -135,9 +507,95 @@ RULES:
 - Use only facts from context
 - If info missing, say "I don't have enough information."
 """
-            answer = self.processor.generate_text(prompt)
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _deadline(deadline_s):
+        if deadline_s is None:
+            deadline_s = float(os.getenv("RAG_QUERY_DEADLINE_S", "0")) or None
+        return Deadline(deadline_s)
+
+    def query(self, query_text, k=4, sources=None, deadline_s=None):
+        """
+        Query Pinecone (optionally restricted to ``sources``) and generate answer via Groq.
+
+        ``deadline_s`` (default ``RAG_QUERY_DEADLINE_S``, unset = no limit) is
+        the end-to-end budget: retrieval is hedged within it and generation
+        switches to the fallback model when too little of it is left.
+
+        Identical concurrent queries (same normalized text, sources, ``k``,
+        index, credentials and, for budgeted queries, the model the budget
+        allows) share one execution and answer. A caller
+        waits for a shared query only as long as its own deadline allows,
+        and runs it again itself if the shared one ran out of time.
+        """
+        deadline = self._deadline(deadline_s)
+        source_ids = tuple(sorted({source_id_for_url(source) for source in sources or ()}))
+        # A budgeted query may be answered by the fallback model; never hand
+        # that answer to a caller whose budget allows the primary one
+        remaining = deadline.remaining()
+        model = None if remaining is None else self.processor.model_for_budget(remaining)
+        key = (self._credentials_id(), self.db.index_name, self.namespace,
+               " ".join(query_text.lower().split()), source_ids, k, model)
+        try:
+            return single_flight("query").do(
+                key, lambda: self._query(query_text, k, sources, deadline),
+                timeout=deadline.remaining(), rerun_on=(DeadlineExceeded,),
+            )
+        except DeadlineExceeded as e:
+            print(f"⏱️ {e}")
+            return DEADLINE_MESSAGE
+
+    def _query(self, query_text, k, sources, deadline):
+        """Answer one query; raises ``DeadlineExceeded`` when ``deadline`` runs out."""
+        try:
+            print(f"🔎 Querying knowledge base for: {query_text}")
+            results = self.retrieve(query_text, k=k, sources=sources, deadline=deadline)
+            if not results:
+                return "No relevant info found."
+            if deadline.expired:
+                raise DeadlineExceeded("deadline spent during retrieval; generation skipped")
+
+            remaining = deadline.remaining()
+            answer = self.processor.generate_text(
+                self._answer_prompt(query_text, results),
+                timeout=remaining,
+                model=self.processor.model_for_budget(remaining),
+            )
+            if answer == DEADLINE_MESSAGE:
+                raise DeadlineExceeded("generation did not finish within the deadline")
             print("✅ Query answered successfully!")
             return answer
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             print(f"❌ Error answering query: {e}")
             return "Query processing failed."
+
+    # ------------------------------------------------------------------
+    def query_stream(self, query_text, k=4, sources=None, deadline_s=None):
+        """Like ``query`` but yields the answer in pieces as Groq streams it."""
+        deadline = self._deadline(deadline_s)
+        try:
+            print(f"🔎 Streaming answer for: {query_text}")
+            results = self.retrieve(query_text, k=k, sources=sources, deadline=deadline)
+            if not results:
+                yield "No relevant info found."
+                return
+            prompt = self._answer_prompt(query_text, results)
+        except DeadlineExceeded as e:
+            print(f"⏱️ {e}")
+            yield DEADLINE_MESSAGE
+            return
+        except Exception as e:
+            print(f"❌ Error answering query: {e}")
+            yield "Query processing failed."
+            return
+        if deadline.expired:
+            print("⏱️ Deadline spent during retrieval; skipping generation.")
+            yield DEADLINE_MESSAGE
+            return
+        remaining = deadline.remaining()
+        yield from self.processor.stream_text(
+            prompt, model=self.processor.model_for_budget(remaining), timeout=remaining
+        )
@@ -0,0 +1,504 @@
+"""
+Sitemap- and change-driven recrawl scheduler.
+
+Keeps every ingested source fresh without re-crawling whole sites:
+
+1. Sources are discovered from the pipeline's ``DocumentStore``.
+2. When a source is due, its pages are checked cheaply, in this order:
+   ``sitemap.xml`` ``lastmod`` values, then HTTP validators (``ETag`` /
+   ``Last-Modified`` via a conditional ``HEAD``), then an estimate of the
+   page's change probability from its own change history (Poisson model).
+3. Candidates from all due sources compete for a global daily Firecrawl
+   budget; only the most likely changed pages are re-scraped.
+4. Each source's check interval adapts: it halves when changes are found
+   and grows when nothing changed.
+
+Run with:
+    python -m src.scheduler.recrawl_scheduler            # loop forever
+    python -m src.scheduler.recrawl_scheduler --once     # single cycle
+"""
+
+import argparse
+import math
+import os
+import sqlite3
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from dotenv import load_dotenv
+
+from src.database.document_store import DocumentStore
+from src.utils.url_utils import normalize_url
+
+# Load environment variables
+load_dotenv()
+
+SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+# Candidate scores: certain signals outrank any probability estimate
+SCORE_CHANGED = 3.0
+SCORE_NEW_PAGE = 2.0
+
+
+def parse_lastmod(value):
+    """Parse a W3C datetime (``2024-05-01`` or ``2024-05-01T10:00:00Z``) to a UTC timestamp."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class RecrawlScheduler:
+    """Decides which pages of which ingested sources to re-scrape, and does it."""
+
+    def __init__(self, pipeline, db_path=None, daily_budget=None, max_pages_per_cycle=None,
+                 min_interval=None, max_interval=None, default_interval=None, change_threshold=None):
+        self.pipeline = pipeline
+        state_dir = os.getenv("RAG_STATE_DIR", ".rag_state")
+        self.db_path = db_path or os.getenv("RECRAWL_DB_PATH", os.path.join(state_dir, "recrawl.sqlite3"))
+        self.daily_budget = daily_budget or int(os.getenv("RECRAWL_DAILY_BUDGET", "500"))
+        self.max_pages_per_cycle = max_pages_per_cycle or int(os.getenv("RECRAWL_MAX_PAGES_PER_CYCLE", "100"))
+        self.min_interval = min_interval or float(os.getenv("RECRAWL_MIN_INTERVAL", str(3600)))
+        self.max_interval = max_interval or float(os.getenv("RECRAWL_MAX_INTERVAL", str(7 * 86400)))
+        self.default_interval = default_interval or float(os.getenv("RECRAWL_DEFAULT_INTERVAL", str(86400)))
+        self.change_threshold = change_threshold or float(os.getenv("RECRAWL_CHANGE_THRESHOLD", "0.3"))
+        self.max_new_pages_per_cycle = int(os.getenv("RECRAWL_MAX_NEW_PAGES_PER_CYCLE", "20"))
+        self.http_timeout = float(os.getenv("RECRAWL_HTTP_TIMEOUT", "10"))
+        self.validation_workers = int(os.getenv("RECRAWL_VALIDATION_WORKERS", "8"))
+        self.user_agent = os.getenv("RECRAWL_USER_AGENT", "Webscraping-Agent-Recrawler/1.0")
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._set_aside_url_keyed_tables()
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sites (
+                source_id TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                mode TEXT,
+                interval_s REAL,
+                next_run_at REAL,
+                last_run_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT NOT NULL,
+                source_id TEXT NOT NULL,
+                doc_id TEXT,
+                lastmod REAL,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                first_seen_at REAL,
+                last_checked_at REAL,
+                last_changed_at REAL,
+                check_count INTEGER DEFAULT 0,
+                change_count INTEGER DEFAULT 0,
+                PRIMARY KEY (source_id, url)
+            );
+            CREATE TABLE IF NOT EXISTS page_changes (
+                source_id TEXT NOT NULL,
+                url TEXT NOT NULL,
+                changed_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS budget (
+                day TEXT PRIMARY KEY,
+                used INTEGER NOT NULL
+            );
+            """
+        )
+        self._copy_url_keyed_tables()
+        self._conn.commit()
+        self.http = requests.Session()
+        self.http.headers["User-Agent"] = self.user_agent
+
+    # ------------------------------------------------------------------
+    # State
+    # ------------------------------------------------------------------
+    # A page can belong to several sources (see ``DocumentStore.make_doc_id``),
+    # so pages are tracked per ``(source_id, url)``. State files from before
+    # that keyed them by URL alone and are upgraded in place.
+    def _set_aside_url_keyed_tables(self):
+        pages = self._conn.execute("PRAGMA table_info(pages)").fetchall()
+        if pages and [row["name"] for row in pages if row["pk"]] == ["url"]:
+            self._conn.execute("ALTER TABLE pages RENAME TO pages_by_url")
+            self._conn.execute("DROP INDEX IF EXISTS pages_source")
+        changes = [row["name"] for row in self._conn.execute("PRAGMA table_info(page_changes)")]
+        if changes and "source_id" not in changes:
+            self._conn.execute("ALTER TABLE page_changes RENAME TO page_changes_by_url")
+
+    def _copy_url_keyed_tables(self):
+        tables = {row[0] for row in self._conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if "pages_by_url" in tables:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO pages (url, source_id, doc_id, lastmod, etag, last_modified, content_hash,"
+                " first_seen_at, last_checked_at, last_changed_at, check_count, change_count)"
+                " SELECT url, source_id, doc_id, lastmod, etag, last_modified, content_hash,"
+                " first_seen_at, last_checked_at, last_changed_at, check_count, change_count FROM pages_by_url"
+            )
+            self._conn.execute("DROP TABLE pages_by_url")
+        if "page_changes_by_url" in tables:
+            self._conn.execute(
+                "INSERT INTO page_changes SELECT COALESCE((SELECT source_id FROM pages"
+                " WHERE pages.url = c.url LIMIT 1), ''), c.url, c.changed_at FROM page_changes_by_url c"
+            )
+            self._conn.execute("DROP TABLE page_changes_by_url")
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            self._conn.commit()
+            return cursor
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def sync_sites(self, now=None):
+        """Pick up sources and pages ingested since the last cycle."""
+        now = now or time.time()
+        store = self.pipeline.document_store
+        for source in store.list_sources():
+            self._execute(
+                "INSERT OR IGNORE INTO sites VALUES (?, ?, ?, ?, ?, ?)",
+                (source["source_id"], source["url"], source["mode"], self.default_interval,
+                 (source["last_ingested_at"] or now) + self.default_interval, source["last_ingested_at"]),
+            )
+            for doc_id, url, content_hash, updated_at in store.list_documents(source["source_id"]):
+                self._execute(
+                    "INSERT OR IGNORE INTO pages (url, source_id, doc_id, content_hash, first_seen_at, last_checked_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (normalize_url(url), source["source_id"], doc_id, content_hash, updated_at, updated_at),
+                )
+
+    def _budget_remaining(self, now):
+        day = datetime.fromtimestamp(now, timezone.utc).strftime("%Y-%m-%d")
+        rows = self._query("SELECT used FROM budget WHERE day = ?", (day,))
+        return max(0, self.daily_budget - (rows[0]["used"] if rows else 0))
+
+    def _spend_budget(self, now, pages):
+        day = datetime.fromtimestamp(now, timezone.utc).strftime("%Y-%m-%d")
+        self._execute(
+            "INSERT INTO budget VALUES (?, ?) ON CONFLICT(day) DO UPDATE SET used = used + excluded.used",
+            (day, pages),
+        )
+
+    # ------------------------------------------------------------------
+    # Change signals
+    # ------------------------------------------------------------------
+    def _fetch_xml(self, url):
+        try:
+            resp = self.http.get(url, timeout=self.http_timeout)
+            if resp.status_code != 200:
+                return None
+            return ET.fromstring(resp.content)
+        except (requests.RequestException, ET.ParseError):
+            return None
+
+    @staticmethod
+    def in_scope(site_url, url):
+        """True if ``url`` is on the source's host and under its path prefix."""
+        site, page = urlsplit(normalize_url(site_url)), urlsplit(normalize_url(url))
+        if site.netloc != page.netloc:
+            return False
+        prefix = site.path.rstrip("/")
+        return not prefix or page.path == prefix or page.path.startswith(prefix + "/")
+
+    def sitemap_entries(self, site_url, max_sitemaps=20):
+        """
+        Return ``{normalized_url: (url, lastmod_ts)}`` from the site's sitemaps,
+        limited to pages under ``site_url`` (sitemaps cover the whole domain).
+        """
+        pending = []
+        try:
+            robots = self.http.get(urljoin(site_url, "/robots.txt"), timeout=self.http_timeout)
+            if robots.status_code == 200:
+                pending = [line.split(":", 1)[1].strip() for line in robots.text.splitlines()
+                           if line.lower().startswith("sitemap:")]
+        except requests.RequestException:
+            pass
+        pending = pending or [urljoin(site_url, "/sitemap.xml")]
+
+        entries, seen = {}, set()
+        while pending and len(seen) < max_sitemaps:
+            sitemap_url = pending.pop(0)
+            if sitemap_url in seen:
+                continue
+            seen.add(sitemap_url)
+            root = self._fetch_xml(sitemap_url)
+            if root is None:
+                continue
+            # A sitemap index points at further sitemaps
+            for child in root.findall(f"{SITEMAP_NS}sitemap"):
+                loc = child.findtext(f"{SITEMAP_NS}loc")
+                if loc:
+                    pending.append(loc.strip())
+            for child in root.findall(f"{SITEMAP_NS}url"):
+                loc = child.findtext(f"{SITEMAP_NS}loc")
+                if loc and self.in_scope(site_url, loc.strip()):
+                    loc = loc.strip()
+                    entries[normalize_url(loc)] = (loc, parse_lastmod(child.findtext(f"{SITEMAP_NS}lastmod")))
+        return entries
+
+    def check_validators(self, page):
+        """
+        Conditional ``HEAD`` for a page.
+
+        Returns ``(status, validators)`` where status is ``"changed"``,
+        ``"unchanged"`` or ``"unknown"`` (no usable validators).
+        """
+        headers = {}
+        if page["etag"]:
+            headers["If-None-Match"] = page["etag"]
+        if page["last_modified"]:
+            headers["If-Modified-Since"] = page["last_modified"]
+        try:
+            resp = self.http.head(page["url"], headers=headers, timeout=self.http_timeout, allow_redirects=True)
+        except requests.RequestException:
+            return "unknown", {}
+
+        validators = {"etag": resp.headers.get("ETag"), "last_modified": resp.headers.get("Last-Modified")}
+        if resp.status_code == 304:
+            return "unchanged", validators
+        if resp.status_code != 200 or not (page["etag"] or page["last_modified"]):
+            return "unknown", validators
+        if page["etag"] and validators["etag"]:
+            return ("unchanged" if validators["etag"] == page["etag"] else "changed"), validators
+        if page["last_modified"] and validators["last_modified"]:
+            try:
+                newer = (parsedate_to_datetime(validators["last_modified"])
+                         > parsedate_to_datetime(page["last_modified"]))
+            except (TypeError, ValueError):
+                return "unknown", validators
+            return ("changed" if newer else "unchanged"), validators
+        return "unknown", validators
+
+    @staticmethod
+    def change_probability(page, now):
+        """
+        Probability that the page changed since it was last checked, assuming
+        changes arrive as a Poisson process with the page's observed rate.
+        """
+        first_seen = page["first_seen_at"] or now
+        observed = max(now - first_seen, 86400.0)
+        rate = (page["change_count"] + 0.5) / observed
+        since_check = max(0.0, now - (page["last_checked_at"] or first_seen))
+        return 1.0 - math.exp(-rate * since_check)
+
+    # ------------------------------------------------------------------
+    # Cycle
+    # ------------------------------------------------------------------
+    def _site_candidates(self, site, now):
+        """Return ``[(score, url, updates)]`` for one due site."""
+        pages = self._query("SELECT * FROM pages WHERE source_id = ?", (site["source_id"],))
+        sitemap = self.sitemap_entries(site["url"]) if site["mode"] == "crawl" else {}
+
+        candidates, to_validate = [], []
+        for page in pages:
+            loc, lastmod = sitemap.get(page["url"], (None, None))
+            if lastmod is not None:
+                # Without a previous lastmod, compare against when we last fetched the page
+                reference = page["lastmod"] if page["lastmod"] is not None else page["last_checked_at"]
+                if reference is None or lastmod > reference:
+                    candidates.append((SCORE_CHANGED, page["url"], {"lastmod": lastmod}))
+                else:
+                    self._mark_checked(site["source_id"], page["url"], now, {"lastmod": lastmod})
+            else:
+                to_validate.append(page)
+
+        with ThreadPoolExecutor(max_workers=self.validation_workers) as executor:
+            results = list(executor.map(self.check_validators, to_validate))
+        for page, (status, validators) in zip(to_validate, results):
+            if status == "changed":
+                candidates.append((SCORE_CHANGED, page["url"], validators))
+            elif status == "unchanged":
+                self._mark_checked(site["source_id"], page["url"], now, validators)
+            else:
+                # Keep fresh validators so the next cycle can send a real conditional request
+                self._mark_checked(site["source_id"], page["url"], now, validators, checked=False)
+                probability = self.change_probability(page, now)
+                if probability >= self.change_threshold:
+                    candidates.append((probability, page["url"], validators))
+
+        # Pages the sitemap lists under the source that were never ingested
+        known = {page["url"] for page in pages}
+        for normalized, (loc, lastmod) in sitemap.items():
+            if normalized not in known:
+                candidates.append((SCORE_NEW_PAGE, loc, {"lastmod": lastmod, "new": True}))
+        return candidates
+
+    def _mark_checked(self, source_id, url, now, validators=None, checked=True):
+        """
+        Store a page's validators; with ``checked=True`` the page also counts
+        as verified at ``now``, which resets its change-probability clock.
+        """
+        validators = validators or {}
+        if not checked:
+            self._execute(
+                "UPDATE pages SET etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified)"
+                " WHERE source_id = ? AND url = ?",
+                (validators.get("etag"), validators.get("last_modified"), source_id, normalize_url(url)),
+            )
+            return
+        self._execute(
+            "UPDATE pages SET last_checked_at = ?, check_count = check_count + 1, lastmod = COALESCE(?, lastmod),"
+            " etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE source_id = ? AND url = ?",
+            (now, validators.get("lastmod"), validators.get("etag"), validators.get("last_modified"),
+             source_id, normalize_url(url)),
+        )
+
+    def _rescrape(self, site, url, updates, now):
+        """Re-scrape one page and record whether its content actually changed."""
+        normalized = normalize_url(url)
+        doc_id = DocumentStore.make_doc_id(url, site["source_id"])
+        before = self.pipeline.document_store.get_content_hash(doc_id)
+
+        num_docs, _ = self.pipeline.process_website(url, mode="scrape", source_url=site["url"], summarize=False)
+        if not num_docs:
+            self._mark_checked(site["source_id"], url, now)
+            return False
+
+        after = self.pipeline.document_store.get_content_hash(doc_id)
+        changed = before != after
+        self._execute(
+            "INSERT INTO pages (url, source_id, doc_id, first_seen_at) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT(source_id, url) DO NOTHING",
+            (normalized, site["source_id"], doc_id, now),
+        )
+        self._execute(
+            "UPDATE pages SET content_hash = ?, last_checked_at = ?, check_count = check_count + 1,"
+            " lastmod = COALESCE(?, lastmod), etag = COALESCE(?, etag),"
+            " last_modified = COALESCE(?, last_modified) WHERE source_id = ? AND url = ?",
+            (after, now, updates.get("lastmod"), updates.get("etag"),
+             updates.get("last_modified"), site["source_id"], normalized),
+        )
+        if changed:
+            self._execute(
+                "UPDATE pages SET change_count = change_count + 1, last_changed_at = ?"
+                " WHERE source_id = ? AND url = ?",
+                (now, site["source_id"], normalized),
+            )
+            self._execute("INSERT INTO page_changes VALUES (?, ?, ?)", (site["source_id"], normalized, now))
+        return changed
+
+    def run_once(self, now=None):
+        """Run one scheduling cycle and return a summary dict."""
+        now = now or time.time()
+        self.expire_sites()
+        self.sync_sites(now)
+        due = self._query("SELECT * FROM sites WHERE next_run_at <= ?", (now,))
+        if not due:
+            return {"sites_checked": 0, "pages_rescraped": 0, "pages_changed": 0}
+
+        candidates = []
+        for site in due:
+            for score, url, updates in self._site_candidates(site, now):
+                candidates.append((score, site, url, updates))
+        # Cap discovery so new pages cannot take the whole budget from refreshes
+        new_pages = [c for c in candidates if c[3].get("new")]
+        if len(new_pages) > self.max_new_pages_per_cycle:
+            new_pages.sort(key=lambda c: c[3].get("lastmod") or 0.0, reverse=True)
+            dropped = {id(c) for c in new_pages[self.max_new_pages_per_cycle:]}
+            candidates = [c for c in candidates if id(c) not in dropped]
+        candidates.sort(key=lambda item: item[0], reverse=True)
+
+        budget = min(self._budget_remaining(now), self.max_pages_per_cycle)
+        selected, deferred = candidates[:budget], candidates[budget:]
+        print(f"🗓️ Recrawl: {len(due)} sites due, {len(candidates)} candidate pages, budget {budget}")
+
+        changes = {site["source_id"]: 0 for site in due}
+        for score, site, url, updates in selected:
+            if self._rescrape(site, url, updates, now):
+                changes[site["source_id"]] += 1
+        self._spend_budget(now, len(selected))
+
+        # Adapt each site's interval; sites that lost pages to the budget retry soon
+        starved = {site["source_id"] for _, site, _, _ in deferred}
+        for site in due:
+            interval = site["interval_s"] or self.default_interval
+            if changes[site["source_id"]]:
+                interval = max(self.min_interval, interval / 2)
+            else:
+                interval = min(self.max_interval, interval * 1.5)
+            next_run = now + (self.min_interval if site["source_id"] in starved else interval)
+            self._execute(
+                "UPDATE sites SET interval_s = ?, next_run_at = ?, last_run_at = ? WHERE source_id = ?",
+                (interval, next_run, now, site["source_id"]),
+            )
+
+        summary = {
+            "sites_checked": len(due),
+            "pages_rescraped": len(selected),
+            "pages_changed": sum(changes.values()),
+            "pages_deferred": len(deferred),
+        }
+        print(f"✅ Recrawl cycle done: {summary}")
+        return summary
+
+    def expire_sites(self):
+        """Drop sources past their TTL (see ``VectorGC``) so they are not re-scraped."""
+        try:
+            expired = self.pipeline.vector_gc.expire_sources()["source_ids"]
+        except Exception as e:
+            print(f"⚠️ Source expiry failed: {e}")
+            return []
+        for source_id in expired:
+            self._execute("DELETE FROM pages WHERE source_id = ?", (source_id,))
+            self._execute("DELETE FROM sites WHERE source_id = ?", (source_id,))
+        return expired
+
+    def run_forever(self, poll_interval=None, stop_event=None):
+        poll_interval = poll_interval or float(os.getenv("RECRAWL_POLL_INTERVAL", "300"))
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"❌ Recrawl cycle failed: {e}")
+            stop_event.wait(poll_interval)
+
+    def site_report(self):
+        """Per-site interval, schedule and change history counts."""
+        rows = self._query(
+            "SELECT s.source_id, s.url, s.interval_s, s.next_run_at, s.last_run_at,"
+            " COUNT(p.url) AS pages, COALESCE(SUM(p.change_count), 0) AS changes"
+            " FROM sites s LEFT JOIN pages p ON p.source_id = s.source_id GROUP BY s.source_id"
+        )
+        return [dict(row) for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep ingested sites fresh by re-scraping changed pages.")
+    parser.add_argument("--once", action="store_true", help="run a single cycle and exit")
+    parser.add_argument("--report", action="store_true", help="print per-site schedule and exit")
+    parser.add_argument("--index-name", default=os.getenv("PINECONE_INDEX_NAME"))
+    parser.add_argument("--namespace", default=os.getenv("PINECONE_NAMESPACE"))
+    args = parser.parse_args()
+
+    from src.rag_pipeline import RAGPipeline
+
+    scheduler = RecrawlScheduler(RAGPipeline(index_name=args.index_name, namespace=args.namespace))
+    if args.report:
+        scheduler.sync_sites()
+        for site in scheduler.site_report():
+            print(site)
+    elif args.once:
+        scheduler.run_once()
+    else:
+        scheduler.run_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,11 @@
 import os
-from firecrawl import FirecrawlApp
+import threading
+import time
 from dotenv import load_dotenv
 
+from src.utils.metrics import stage_metrics
+from src.utils.rate_limiter import limited_call
+
 # Load environment variables
 load_dotenv()
 
@@ -9,29 +13,118 @@ load_dotenv()
 class FirecrawlWebScraper:
     """Class for scraping or crawling webpages using the Firecrawl API."""
 
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, api_url=None):
         """
         Initialize the Firecrawl web scraper with the specified API key.
 
         Args:
             api_key (str, optional): The Firecrawl API key.
                                      If not provided, it will be loaded from the environment.
+            api_url (str, optional): Firecrawl API base URL (``FIRECRAWL_API_URL``),
+                                     e.g. a self-hosted instance or a local stand-in.
         """
         self.api_key = api_key or os.getenv("FIRECRAWL_API_KEY")
+        self.api_url = api_url or os.getenv("FIRECRAWL_API_URL")
 
         if not self.api_key:
             raise ValueError(
                 "❌ Firecrawl API key not found. Please set FIRECRAWL_API_KEY in your .env or pass it explicitly."
             )
 
-        try:
-            self.client = FirecrawlApp(api_key=self.api_key)
-            print("✅ Firecrawl client initialized successfully.")
-        except Exception as e:
-            raise ValueError(f"❌ Error initializing Firecrawl scraper: {str(e)}")
+        # The Firecrawl SDK is imported and the client built on first use so
+        # that constructing the scraper stays cheap.
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    # ----------------------------------------------------------------------
+    @property
+    def client(self):
+        """Lazily build the Firecrawl client on first use."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    try:
+                        from firecrawl import FirecrawlApp
+
+                        if self.api_url:
+                            self._client = FirecrawlApp(api_key=self.api_key, api_url=self.api_url)
+                        else:
+                            self._client = FirecrawlApp(api_key=self.api_key)
+                        print("✅ Firecrawl client initialized successfully.")
+                    except Exception as e:
+                        raise ValueError(f"❌ Error initializing Firecrawl scraper: {str(e)}")
+        return self._client
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def _to_document(item):
+        """Convert a Firecrawl page (dict- or object-style) into a Document."""
+        from langchain_core.documents import Document
+
+        # Handle both dict-style and object-style responses
+        if isinstance(item, dict):
+            content = (
+                item.get("markdown")
+                or item.get("html")
+                or item.get("rawHtml", "")
+            )
+            metadata = item.get("metadata", {}) or {}
+        else:
+            content = getattr(item, "markdown", None) or getattr(item, "html", None)
+            metadata = getattr(item, "metadata", {}) or {}
+
+        # Ensure metadata is a dictionary
+        if not isinstance(metadata, dict):
+            if hasattr(metadata, "__dict__"):
+                metadata = metadata.__dict__
+            else:
+                metadata = {"metadata": str(metadata)}
+
+        if not content:
+            return None
+        return Document(page_content=content, metadata=dict(metadata))
 
     # ----------------------------------------------------------------------
-    def scrape_url(self, url, mode="scrape", params=None):
+    def _crawl(self, url, scrape_params, progress_callback=None, cancel_event=None):
+        """
+        Run a crawl job, polling its status so that progress can be reported
+        and the job cancelled while it runs.
+        """
+        # Older SDKs only expose the blocking ``crawl`` call.
+        if not hasattr(self.client, "start_crawl") or not hasattr(self.client, "get_crawl_status"):
+            response = limited_call("firecrawl", lambda: self.client.crawl(url, **scrape_params))
+            return getattr(response, "data", []) or []
+
+        poll_interval = float(os.getenv("FIRECRAWL_POLL_INTERVAL", "2"))
+        job = limited_call("firecrawl", lambda: self.client.start_crawl(url, **scrape_params))
+        job_id = getattr(job, "id", None) or job["id"]
+
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                try:
+                    limited_call("firecrawl", lambda: self.client.cancel_crawl(job_id))
+                    print(f"🛑 Cancelled crawl job {job_id} for {url}")
+                except Exception as e:
+                    print(f"⚠️ Could not cancel crawl job {job_id}: {e}")
+                return []
+
+            status = limited_call("firecrawl", lambda: self.client.get_crawl_status(job_id))
+            state = getattr(status, "status", None)
+            if progress_callback:
+                progress_callback(
+                    stage="scraping",
+                    pages_scraped=getattr(status, "completed", 0) or 0,
+                    pages_total=getattr(status, "total", 0) or 0,
+                )
+
+            if state == "completed":
+                return getattr(status, "data", []) or []
+            if state in ("failed", "cancelled"):
+                raise RuntimeError(f"Crawl job {job_id} ended with status '{state}'")
+            time.sleep(poll_interval)
+
+    # ----------------------------------------------------------------------
+    def scrape_url(self, url, mode="scrape", params=None, progress_callback=None, cancel_event=None):
         """
         Core function to call Firecrawl API for scraping or crawling.
 
@@ -39,72 +132,54 @@ class FirecrawlWebScraper:
             url (str): Target webpage or site URL.
             mode (str): Either "scrape" (single page) or "crawl" (entire site).
             params (dict, optional): Extra API parameters.
+            progress_callback (callable, optional): Called with progress
+                keyword arguments while a crawl runs.
+            cancel_event (threading.Event, optional): Set to cancel a crawl.
 
         Returns:
             list: List of LangChain Document objects.
         """
-        try:
-            from langchain_core.documents import Document
-
-            scrape_params = params or {}
-            documents = []
-
-            # --- SCRAPE (single page) ---
-            if mode == "scrape":
-                response = self.client.scrape(url, **scrape_params)
-                content = getattr(response, "markdown", None) or getattr(response, "html", None)
-                metadata = getattr(response, "metadata", {}) or {}
-
-                # Ensure metadata is a dictionary
-                if not isinstance(metadata, dict):
-                    if hasattr(metadata, "__dict__"):
-                        metadata = metadata.__dict__
-                    else:
-                        metadata = {"metadata": str(metadata)}
-
-                if content:
-                    documents.append(Document(page_content=content, metadata=dict(metadata)))
-
-            # --- CRAWL (entire website) ---
-            elif mode == "crawl":
-                response = self.client.crawl(url, **scrape_params)
-
-                for item in getattr(response, "data", []):
-                    # Handle both dict-style and object-style responses
-                    if isinstance(item, dict):
-                        content = (
-                            item.get("markdown")
-                            or item.get("html")
-                            or item.get("rawHtml", "")
-                        )
-                        metadata = item.get("metadata", {})
-                    else:
-                        content = getattr(item, "markdown", None) or getattr(item, "html", None)
-                        metadata = getattr(item, "metadata", {}) or {}
-
-                        if not isinstance(metadata, dict) and hasattr(metadata, "__dict__"):
-                            metadata = metadata.__dict__
-
-                    if content:
-                        documents.append(Document(page_content=content, metadata=dict(metadata)))
-
-            else:
-                raise ValueError(f"Unsupported mode: {mode}")
-
-            print(f"✅ Scraped {len(documents)} documents from {url}")
-            return documents
-
-        except Exception as e:
-            print(f"❌ Error scraping {url}: {e}")
-            return []
+        with stage_metrics.timer(f"firecrawl.{mode}") as timer:
+            try:
+                scrape_params = params or {}
+                documents = []
+
+                # --- SCRAPE (single page) ---
+                if mode == "scrape":
+                    response = limited_call("firecrawl", lambda: self.client.scrape(url, **scrape_params))
+                    document = self._to_document(response)
+                    if document:
+                        documents.append(document)
+
+                # --- CRAWL (entire website) ---
+                elif mode == "crawl":
+                    items = self._crawl(url, scrape_params, progress_callback, cancel_event)
+                    for item in items:
+                        document = self._to_document(item)
+                        if document:
+                            documents.append(document)
+
+                else:
+                    raise ValueError(f"Unsupported mode: {mode}")
+
+                print(f"✅ Scraped {len(documents)} documents from {url}")
+                return documents
+
+            except Exception as e:
+                timer.ok = False
+                print(f"❌ Error scraping {url}: {e}")
+                return []
 
     # ----------------------------------------------------------------------
-    def crawl_website(self, url, params=None):
+    def crawl_website(self, url, params=None, progress_callback=None, cancel_event=None):
         """
         Wrapper for full-site crawling.
         Example: Used when mode='crawl' in RAGPipeline.
         """
-        return self.scrape_url(url, mode="crawl", params=params)
+        return self.scrape_url(
+            url, mode="crawl", params=params,
+            progress_callback=progress_callback, cancel_event=cancel_event,
+        )
 
     # ----------------------------------------------------------------------
     def scrape_website(self, url, params=None):
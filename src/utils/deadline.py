@@ -0,0 +1,126 @@
+"""
+Per-request deadlines and hedged calls for tail-latency control.
+
+``hedged_call`` runs a blocking call and, if it has not answered by the
+observed latency percentile of that operation, fires a duplicate; whichever
+finishes first wins. All attempts stay within the caller's ``Deadline``.
+"""
+
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from src.utils.metrics import percentile
+
+
+# Answer returned to users when a request's deadline runs out
+DEADLINE_MESSAGE = "The answer could not be generated in time. Please try again."
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a call cannot finish within the request's deadline."""
+
+
+class Deadline:
+    """A point in time a request must finish by; ``seconds=None`` means no limit."""
+
+    def __init__(self, seconds=None):
+        self.expires_at = time.monotonic() + seconds if seconds is not None else None
+
+    def remaining(self):
+        """Seconds left (never negative), or None without a limit."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self):
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+
+class LatencyTracker:
+    """Rolling window of recent latencies per operation key."""
+
+    def __init__(self, window=500, min_samples=20):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, seconds):
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, key, pct, default=None):
+        """Latency percentile in seconds, or ``default`` until enough samples exist."""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < self.min_samples:
+            return default
+        return percentile(samples, pct)
+
+
+# Shared process-wide tracker and pool for hedged attempts
+latency_tracker = LatencyTracker()
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("RAG_HEDGE_WORKERS", "32")), thread_name_prefix="rag-hedge"
+)
+
+
+def hedged_call(fn, key, deadline=None, hedge_percentile=None, max_hedges=None):
+    """
+    Call ``fn()`` with up to ``max_hedges`` duplicate attempts.
+
+    A duplicate is sent once the first attempt has been outstanding longer
+    than the ``hedge_percentile`` latency of ``key`` (or right away if an
+    attempt fails). Raises ``DeadlineExceeded`` when ``deadline`` passes
+    first, or the last attempt's exception when every attempt failed.
+    """
+    hedge_percentile = hedge_percentile or float(os.getenv("RAG_HEDGE_PERCENTILE", "95"))
+    max_hedges = max_hedges if max_hedges is not None else int(os.getenv("RAG_HEDGE_MAX", "1"))
+    default_delay = float(os.getenv("RAG_HEDGE_DEFAULT_DELAY_MS", "300")) / 1000.0
+    min_delay = float(os.getenv("RAG_HEDGE_MIN_DELAY_MS", "20")) / 1000.0
+    hedge_delay = max(min_delay, latency_tracker.percentile(key, hedge_percentile, default_delay))
+    deadline = deadline or Deadline()
+    if deadline.expired:
+        raise DeadlineExceeded(f"{key} was not started: the deadline had already passed")
+
+    def attempt():
+        start = time.monotonic()
+        result = fn()
+        latency_tracker.record(key, time.monotonic() - start)
+        return result
+
+    def launch():
+        # Carry context variables (e.g. request priority) into the worker thread
+        return _executor.submit(contextvars.copy_context().run, attempt)
+
+    pending = {launch()}
+    hedges, last_error = 0, None
+    next_hedge_at = time.monotonic() + hedge_delay
+
+    while pending:
+        timeout = max(0.0, next_hedge_at - time.monotonic()) if hedges < max_hedges else None
+        remaining = deadline.remaining()
+        if remaining is not None:
+            timeout = remaining if timeout is None else min(timeout, remaining)
+
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                for other in pending:
+                    other.cancel()
+                return future.result()
+            last_error = future.exception()
+
+        if deadline.expired:
+            raise DeadlineExceeded(f"{key} did not finish within the deadline")
+        if hedges < max_hedges and (not pending or time.monotonic() >= next_hedge_at):
+            hedges += 1
+            pending.add(launch())
+            next_hedge_at = time.monotonic() + hedge_delay
+
+    raise last_error
@@ -0,0 +1,92 @@
+"""
+Lightweight in-process latency metrics, recorded per pipeline stage.
+
+Components wrap their upstream calls in ``stage_metrics.timer("<stage>")``;
+the load-testing harness and the HTTP service read ``snapshot()``.
+"""
+
+import threading
+import time
+from collections import deque
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class _StageTimer:
+    """Context manager returned by ``StageMetrics.timer``; set ``ok = False`` to record a failure."""
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+        self.ok = True
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.ok = False
+        self.metrics.record(self.stage, time.perf_counter() - self.start, ok=self.ok)
+        return False
+
+
+class StageMetrics:
+    """Thread-safe per-stage latency samples and error counts."""
+
+    def __init__(self, max_samples=10000):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._counts = {}
+        self._errors = {}
+
+    def timer(self, stage):
+        return _StageTimer(self, stage)
+
+    def record(self, stage, seconds, ok=True):
+        with self._lock:
+            if stage not in self._samples:
+                self._samples[stage] = deque(maxlen=self.max_samples)
+                self._counts[stage] = 0
+                self._errors[stage] = 0
+            self._samples[stage].append(seconds)
+            self._counts[stage] += 1
+            if not ok:
+                self._errors[stage] += 1
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+            self._errors.clear()
+
+    def snapshot(self):
+        """Return ``{stage: {count, errors, p50_ms, p95_ms, p99_ms, max_ms}}``."""
+        with self._lock:
+            stages = {stage: sorted(samples) for stage, samples in self._samples.items()}
+            counts = dict(self._counts)
+            errors = dict(self._errors)
+
+        report = {}
+        for stage, samples in sorted(stages.items()):
+            report[stage] = {
+                "count": counts[stage],
+                "errors": errors[stage],
+                "p50_ms": percentile(samples, 50) * 1000,
+                "p95_ms": percentile(samples, 95) * 1000,
+                "p99_ms": percentile(samples, 99) * 1000,
+                "max_ms": (samples[-1] if samples else 0.0) * 1000,
+            }
+        return report
+
+
+# Shared process-wide registry
+stage_metrics = StageMetrics()
@@ -0,0 +1,313 @@
+"""
+Shared client-side rate limiting and adaptive concurrency for upstream APIs.
+
+Each provider (``groq``, ``firecrawl``, ``huggingface``, ``pinecone``) gets one
+process-wide ``AdaptiveLimiter`` combining:
+
+* token buckets for requests/second and, for Groq, LLM tokens/minute;
+* an AIMD concurrency limit that halves on 429/503 (honouring
+  ``Retry-After``) and grows back by one slot per window of successes;
+* priority queueing, so interactive queries go ahead of bulk ingestion.
+
+Callers wrap each upstream request::
+
+    with rate_limit("groq", tokens=estimate) as slot:
+        resp = requests.post(...)
+        slot.observe(resp)
+
+Pass ``deadline`` (a ``src.utils.deadline.Deadline``) to give up with
+``DeadlineExceeded`` instead of queueing past it. Limits come from
+``RATE_LIMIT_<PROVIDER>_RPS``, ``_CONCURRENCY`` and (Groq) ``_TPM``; ``0``
+disables that limit.
+"""
+
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+from src.utils.deadline import DeadlineExceeded
+
+INTERACTIVE = 0
+BULK = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+THROTTLE_STATUSES = (429, 503)
+
+# Defaults per provider: requests/s, max concurrency, tokens/min
+DEFAULT_LIMITS = {
+    "groq": (5.0, 8, 60000),
+    "firecrawl": (2.0, 4, 0),
+    "huggingface": (5.0, 4, 0),
+    "pinecone": (50.0, 16, 0),
+}
+
+_priority = contextvars.ContextVar("rag_request_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def request_priority(level):
+    """Run the enclosed upstream calls at ``level`` (``INTERACTIVE`` or ``BULK``)."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def parse_retry_after(value):
+    """``Retry-After`` header (seconds or HTTP date) -> seconds, or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _header(headers, name):
+    getter = getattr(headers, "get", None)
+    return (getter(name) or getter(name.lower())) if getter else None
+
+
+def _status_and_headers(error):
+    """Best-effort HTTP status and headers of an SDK / requests exception."""
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(error, "status", None) \
+        or getattr(error, "status_code", None)
+    headers = getattr(response, "headers", None) or getattr(error, "headers", None) or {}
+    if status is None and ("429" in str(error) or "rate limit" in str(error).lower()):
+        status = 429
+    return status, headers
+
+
+class TokenBucket:
+    """Refills ``rate`` units per second up to ``capacity``; not thread-safe on its own."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until ``amount`` units are available."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self.level -= min(amount, self.capacity)
+
+
+class _Slot:
+    """An acquired request slot; report the outcome with ``observe``."""
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.throttled = False
+
+    def observe(self, response):
+        """Inspect a response's status and ``Retry-After``; returns True when throttled."""
+        status = getattr(response, "status_code", None)
+        if status in THROTTLE_STATUSES:
+            self.throttled = True
+            self.limiter._on_throttle(parse_retry_after(_header(response.headers, "Retry-After")))
+        return self.throttled
+
+
+class AdaptiveLimiter:
+    """Rate, token and adaptive concurrency limits for one upstream provider."""
+
+    def __init__(self, name, rps=0.0, max_concurrency=0, tokens_per_minute=0, min_concurrency=1):
+        self.name = name
+        self.max_concurrency = max_concurrency or None
+        self.min_concurrency = min_concurrency
+        self.limit = float(max_concurrency or 0)
+        self._requests = TokenBucket(rps, max(1.0, rps)) if rps else None
+        self._tokens = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute) if tokens_per_minute else None
+
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._blocked_until = 0.0
+        self._successes = 0
+        self._stats = {"requests": 0, "throttled": 0, "wait_s": 0.0}
+
+    # ------------------------------------------------------------------
+    def _wait_needed(self, tokens, now):
+        waits = [self._blocked_until - now]
+        if self.max_concurrency and self._in_flight >= int(self.limit):
+            waits.append(None)  # until a slot is released
+        if self._requests:
+            waits.append(self._requests.wait_time(1, now))
+        if self._tokens and tokens:
+            waits.append(self._tokens.wait_time(tokens, now))
+        if None in waits:
+            return None
+        return max(waits)
+
+    @contextmanager
+    def acquire(self, tokens=0, deadline=None):
+        """
+        Block until a request (costing ``tokens`` LLM tokens) may start.
+
+        Raises ``DeadlineExceeded`` if ``deadline`` passes while queued.
+        """
+        ticket = (_priority.get(), next(self._seq))
+        start = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = self._wait_needed(tokens, now) if self._waiters[0] == ticket else None
+                    if wait is not None and wait <= 0:
+                        break
+                    remaining = deadline.remaining() if deadline is not None else None
+                    if remaining is not None:
+                        if remaining <= 0:
+                            raise DeadlineExceeded(f"{self.name} request was still queued at the deadline")
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._cond.wait(timeout=wait)
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                # Whoever is now at the head of the queue re-checks
+                self._cond.notify_all()
+            if self._requests:
+                self._requests.take(1)
+            if self._tokens and tokens:
+                self._tokens.take(tokens)
+            self._in_flight += 1
+            self._stats["requests"] += 1
+            self._stats["wait_s"] += time.monotonic() - start
+
+        slot = _Slot(self)
+        try:
+            yield slot
+        except Exception as e:
+            status, headers = _status_and_headers(e)
+            if status in THROTTLE_STATUSES and not slot.throttled:
+                slot.throttled = True
+                self._on_throttle(parse_retry_after(_header(headers, "Retry-After")))
+            raise
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                if not slot.throttled:
+                    self._on_success()
+                self._cond.notify_all()
+
+    # ------------------------------------------------------------------
+    def _on_success(self):
+        # Additive increase: one more slot per ``limit`` successful requests
+        if not self.max_concurrency:
+            return
+        self._successes += 1
+        if self._successes >= self.limit:
+            self._successes = 0
+            self.limit = min(self.max_concurrency, self.limit + 1)
+
+    def _on_throttle(self, retry_after):
+        with self._cond:
+            self._stats["throttled"] += 1
+            self._successes = 0
+            if self.max_concurrency:
+                self.limit = max(self.min_concurrency, self.limit / 2)
+            backoff = retry_after if retry_after is not None else float(os.getenv("RATE_LIMIT_BACKOFF_S", "1"))
+            self._blocked_until = max(self._blocked_until, time.monotonic() + backoff)
+            print(f"🚦 {self.name} throttled; concurrency limit {self.limit:.0f}, pausing {backoff:.1f}s")
+            self._cond.notify_all()
+
+    def snapshot(self):
+        with self._cond:
+            queued = {name: 0 for name in PRIORITY_NAMES.values()}
+            for level, _ in self._waiters:
+                queued[PRIORITY_NAMES.get(level, str(level))] += 1
+            return {
+                "concurrency_limit": int(self.limit) if self.max_concurrency else None,
+                "in_flight": self._in_flight,
+                "queued": queued,
+                "requests": self._stats["requests"],
+                "throttled": self._stats["throttled"],
+                "avg_wait_ms": self._stats["wait_s"] / self._stats["requests"] * 1000 if self._stats["requests"] else 0.0,
+                "paused_for_s": max(0.0, self._blocked_until - time.monotonic()),
+            }
+
+
+_LIMITERS = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def limiter(name):
+    """Return the process-wide limiter for provider ``name``, configured from the environment."""
+    with _LIMITERS_LOCK:
+        instance = _LIMITERS.get(name)
+        if instance is None:
+            rps, concurrency, tpm = DEFAULT_LIMITS.get(name, (0.0, 0, 0))
+            prefix = f"RATE_LIMIT_{name.upper()}"
+            instance = _LIMITERS[name] = AdaptiveLimiter(
+                name,
+                rps=float(os.getenv(f"{prefix}_RPS", str(rps))),
+                max_concurrency=int(os.getenv(f"{prefix}_CONCURRENCY", str(concurrency))),
+                tokens_per_minute=int(os.getenv(f"{prefix}_TPM", str(tpm))),
+            )
+        return instance
+
+
+def rate_limit(name, tokens=0, deadline=None):
+    """Context manager acquiring a request slot from provider ``name``'s limiter."""
+    return limiter(name).acquire(tokens, deadline=deadline)
+
+
+def limited_call(name, fn, tokens=0, retries=None, deadline=None, retry_on=None):
+    """
+    Call ``fn()`` under ``name``'s limiter, retrying throttled attempts.
+
+    The limiter's pause (``Retry-After`` or ``RATE_LIMIT_BACKOFF_S``) spaces
+    the retries; the last error is re-raised once ``retries`` are used up.
+    Other errors for which ``retry_on(error)`` is true (e.g. dropped
+    connections) are retried too, after ``RATE_LIMIT_BACKOFF_S`` times the
+    attempt number. Raises ``DeadlineExceeded`` if ``deadline`` passes while
+    waiting for a slot.
+    """
+    retries = retries if retries is not None else int(os.getenv("RATE_LIMIT_MAX_RETRIES", "3"))
+    for attempt in range(retries + 1):
+        try:
+            with rate_limit(name, tokens, deadline=deadline):
+                return fn()
+        except Exception as e:
+            if attempt == retries:
+                raise
+            # Throttled attempts are retried once the limiter's pause is over
+            if _status_and_headers(e)[0] in THROTTLE_STATUSES:
+                continue
+            if retry_on is None or not retry_on(e):
+                raise
+            backoff = float(os.getenv("RATE_LIMIT_BACKOFF_S", "1")) * (attempt + 1)
+            remaining = deadline.remaining() if deadline is not None else None
+            if remaining is not None and remaining < backoff:
+                raise
+            print(f"⚠️ {name} call failed (attempt {attempt + 1}/{retries + 1}): {e}")
+            time.sleep(backoff)
+
+
+def limiter_stats():
+    """Return ``{provider: snapshot}`` for every limiter in use."""
+    with _LIMITERS_LOCK:
+        limiters = dict(_LIMITERS)
+    return {name: instance.snapshot() for name, instance in limiters.items()}
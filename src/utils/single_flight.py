@@ -0,0 +1,127 @@
+"""
+In-process single-flight coalescing.
+
+Concurrent calls with the same key share one execution: the first caller
+runs the function, later callers wait for it and receive the same result
+(or exception). Groups are process-wide so callers from different pipeline
+instances (e.g. Streamlit sessions) coalesce too.
+
+Keys must capture everything the outcome depends on, including whose
+credentials the call runs with.
+"""
+
+import os
+import threading
+
+from src.utils.deadline import Deadline, DeadlineExceeded
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """A named group of in-flight calls keyed by hashable keys."""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._calls = 0
+        self._executions = 0
+
+    def do(self, key, fn, timeout=None, rerun_on=(), cancel_event=None):
+        """
+        Run ``fn()`` unless an identical call is in flight, then share its outcome.
+
+        A caller joining a call in flight waits at most ``timeout`` seconds
+        (``DeadlineExceeded`` after that). Errors of the types in ``rerun_on``
+        belong to the leader's own request (its deadline, its cancellation),
+        so followers that see one try again instead of re-raising it. A
+        follower whose ``cancel_event`` is set stops waiting and calls
+        ``fn()`` itself, which is expected to notice the cancellation.
+        """
+        if os.getenv("RAG_SINGLE_FLIGHT", "1") == "0":
+            return fn()
+
+        deadline = Deadline(timeout)
+        with self._lock:
+            self._calls += 1
+        while True:
+            with self._lock:
+                call = self._in_flight.get(key)
+                leader = call is None
+                if leader:
+                    call = self._in_flight[key] = _Call()
+                    self._executions += 1
+
+            if leader:
+                try:
+                    call.result = fn()
+                    return call.result
+                except BaseException as e:
+                    call.error = e
+                    raise
+                finally:
+                    with self._lock:
+                        del self._in_flight[key]
+                    call.done.set()
+
+            if not self._follow(call, deadline, cancel_event):
+                if cancel_event is not None and cancel_event.is_set():
+                    with self._lock:
+                        self._executions += 1
+                    return fn()
+                raise DeadlineExceeded(f"{self.name} call in flight did not finish within the deadline")
+            if isinstance(call.error, rerun_on):
+                continue
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+    @staticmethod
+    def _follow(call, deadline, cancel_event):
+        """Wait for ``call``; False if the deadline passed or the caller cancelled first."""
+        if cancel_event is None:
+            return call.done.wait(deadline.remaining())
+        while not call.done.is_set():
+            if cancel_event.is_set() or deadline.expired:
+                return False
+            remaining = deadline.remaining()
+            call.done.wait(0.1 if remaining is None else min(0.1, remaining))
+        return True
+
+    def stats(self):
+        with self._lock:
+            calls, executions, in_flight = self._calls, self._executions, len(self._in_flight)
+        coalesced = calls - executions
+        return {
+            "calls": calls,
+            "executions": executions,
+            "coalesced": coalesced,
+            "coalescing_rate": coalesced / calls if calls else 0.0,
+            "in_flight": in_flight,
+        }
+
+
+_GROUPS = {}
+_GROUPS_LOCK = threading.Lock()
+
+
+def single_flight(name):
+    """Return the process-wide group called ``name``."""
+    with _GROUPS_LOCK:
+        group = _GROUPS.get(name)
+        if group is None:
+            group = _GROUPS[name] = SingleFlight(name)
+        return group
+
+
+def coalescing_stats():
+    """Return ``{group: stats}`` for every group."""
+    with _GROUPS_LOCK:
+        groups = list(_GROUPS.values())
+    return {group.name: group.stats() for group in groups}
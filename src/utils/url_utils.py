@@ -0,0 +1,33 @@
+"""
+URL helpers shared by the pipeline, scheduler and request coalescing.
+"""
+
+import hashlib
+from urllib.parse import urlsplit, urlunsplit
+
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url):
+    """
+    Normalize a URL so that trivially different spellings compare equal:
+    lowercase scheme and host, drop default ports, fragments and trailing
+    slashes, and assume ``https`` when no scheme is given.
+    """
+    url = (url or "").strip()
+    if "://" not in url:
+        url = f"https://{url}"
+
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/")
+    return urlunsplit((scheme, host, path, parts.query, ""))
+
+
+def source_id_for_url(url):
+    """Return a compact, stable ID (12 hex chars) for an ingested source URL."""
+    return hashlib.sha1(normalize_url(url).encode("utf-8")).hexdigest()[:12]
@@ -0,0 +1,159 @@
+"""
+Background ingestion worker.
+
+Runs ``RAGPipeline.process_website`` on a small thread pool so that callers
+(the Streamlit app, the HTTP service) can submit a URL, poll its progress and
+cancel it without blocking on the crawl.
+"""
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from src.rag_pipeline import IngestionCancelled
+
+
+class IngestionJob:
+    """State of a single submitted ingestion."""
+
+    def __init__(self, url, mode):
+        self.id = uuid.uuid4().hex[:12]
+        self.url = url
+        self.mode = mode
+        self.status = "queued"
+        self.progress = {}
+        self.num_docs = 0
+        self.summary = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self.future = None
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    def update_progress(self, **progress):
+        with self._lock:
+            self.progress.update(progress)
+
+    def cancel(self):
+        """Request cancellation; queued jobs are dropped before they start."""
+        self.cancel_event.set()
+        if self.future is not None and self.future.cancel():
+            self._finish("cancelled")
+
+    def _finish(self, status, error=None):
+        with self._lock:
+            self.status = status
+            self.error = error
+            self.finished_at = time.time()
+
+    @property
+    def done(self):
+        return self.status in ("completed", "failed", "cancelled")
+
+    def to_dict(self):
+        """Return a JSON-serialisable snapshot of the job."""
+        with self._lock:
+            return {
+                "id": self.id,
+                "url": self.url,
+                "mode": self.mode,
+                "status": self.status,
+                "progress": dict(self.progress),
+                "num_docs": self.num_docs,
+                "summary": self.summary,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+
+class IngestionWorker:
+    """
+    Thread pool that runs ingestion jobs in the background.
+
+    Jobs are kept in memory; finished jobs older than ``RAG_INGEST_JOB_TTL``
+    seconds are pruned on the next submission.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or int(os.getenv("RAG_INGEST_WORKERS", "2"))
+        self.job_ttl = float(os.getenv("RAG_INGEST_JOB_TTL", "3600"))
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="rag-ingest"
+        )
+        self._jobs = {}
+        self._lock = threading.Lock()
+        print(f"✅ IngestionWorker started with {self.max_workers} workers.")
+
+    # ------------------------------------------------------------------
+    def submit(self, pipeline, url, mode="scrape"):
+        """Queue ``url`` for ingestion and return the job id."""
+        job = IngestionJob(url, mode)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        job.future = self._executor.submit(self._run, job, pipeline)
+        print(f"📥 Queued ingestion job {job.id} for {url} ({mode})")
+        return job.id
+
+    def get(self, job_id):
+        """Return a snapshot dict of the job, or None if unknown."""
+        job = self._jobs.get(job_id)
+        return job.to_dict() if job else None
+
+    def cancel(self, job_id):
+        """Cancel a job; returns False if the job is unknown or already done."""
+        job = self._jobs.get(job_id)
+        if not job or job.done:
+            return False
+        job.cancel()
+        return True
+
+    def list_jobs(self):
+        with self._lock:
+            return [job.to_dict() for job in self._jobs.values()]
+
+    def shutdown(self, wait=False):
+        for job in list(self._jobs.values()):
+            if not job.done:
+                job.cancel()
+        self._executor.shutdown(wait=wait)
+
+    # ------------------------------------------------------------------
+    def _prune(self):
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            if job.done and job.finished_at and now - job.finished_at > self.job_ttl:
+                del self._jobs[job_id]
+
+    def _run(self, job, pipeline):
+        if job.cancel_event.is_set():
+            job._finish("cancelled")
+            return
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            num_docs, summary = pipeline.process_website(
+                job.url,
+                mode=job.mode,
+                progress_callback=job.update_progress,
+                cancel_event=job.cancel_event,
+            )
+            job.num_docs = num_docs
+            job.summary = summary
+            # A cancel that arrives after the pipeline returned is too late
+            if num_docs > 0:
+                job._finish("completed")
+            else:
+                job._finish("failed", error=summary or "No documents were added.")
+        except IngestionCancelled:
+            job._finish("cancelled")
+        except Exception as e:
+            print(f"❌ Ingestion job {job.id} failed: {e}")
+            job._finish("failed", error=str(e))
@@ -1,4 +1,5 @@
 import streamlit as st
+import requests
 import time
 import sys
 import os
@@ -6,6 +7,11 @@ import os
 # Add project root to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from src.rag_pipeline import RAGPipeline
+from src.workers.ingestion_worker import IngestionWorker
+from src.api.client import RAGServiceClient
+
+# When set, the app is a thin client of the HTTP service (src/api/server.py)
+RAG_SERVICE_URL = os.getenv("RAG_SERVICE_URL")
 
 # Set page configuration
 st.set_page_config(
@@ -204,67 +210,155 @@ def save_api_keys():
         st.error("Firecrawl API key is required.")
         return
 
-    # Set keys as submitted and show a loading message
+    # Set keys as submitted and rebuild the pipeline with the new keys
     st.session_state.api_keys_submitted = True
+    st.session_state.pop("rag_pipeline", None)
+    st.rerun()
 
     # Initialize RAG pipeline with the provided API keys (Groq key preferred)
-with st.spinner("Initializing RAG pipeline and validating API keys..."):
-    try:
-        print("Attempting to initialize RAG pipeline with API keys...")
-
-        # Prefer Groq key if provided
-        st.session_state.rag_pipeline = RAGPipeline(
-            groq_api_key=st.session_state.groq_api_key or st.session_state.openai_api_key,
-            pinecone_api_key=st.session_state.pinecone_api_key,
-            pinecone_environment=st.session_state.pinecone_environment,
-            firecrawl_api_key=st.session_state.firecrawl_api_key
-        )
-
-        print("RAG pipeline initialized successfully!")
-        st.success("API keys validated and RAG pipeline initialized successfully!")
-        st.session_state.api_keys_submitted = True
-
-        print(
-            f"Session state after initialization: api_keys_submitted={st.session_state.api_keys_submitted}, "
-            f"rag_pipeline exists={hasattr(st.session_state, 'rag_pipeline')}"
-        )
-
-    except ValueError as ve:
-        print(f"Validation Error: {str(ve)}")
-        st.error(f"Validation Error: {str(ve)}")
-        st.session_state.api_keys_submitted = False
+# The pipeline is built once per session; heavy components load lazily and
+# are warmed up in the background instead of on every rerun.
+if "rag_pipeline" not in st.session_state and RAG_SERVICE_URL:
+    # API keys live on the service; nothing to validate here
+    st.session_state.rag_pipeline = RAGServiceClient(RAG_SERVICE_URL)
+    st.session_state.api_keys_submitted = True
 
-    except Exception as e:
-        print(f"Error initializing RAG pipeline: {str(e)}")
-        st.error(f"Error initializing RAG pipeline: {str(e)}")
-        st.session_state.api_keys_submitted = False
+if "rag_pipeline" not in st.session_state:
+    with st.spinner("Initializing RAG pipeline and validating API keys..."):
+        try:
+            print("Attempting to initialize RAG pipeline with API keys...")
+
+            # Prefer Groq key if provided
+            st.session_state.rag_pipeline = RAGPipeline(
+                groq_api_key=st.session_state.groq_api_key or st.session_state.openai_api_key,
+                pinecone_api_key=st.session_state.pinecone_api_key,
+                pinecone_environment=st.session_state.pinecone_environment,
+                firecrawl_api_key=st.session_state.firecrawl_api_key,
+                warmup="background",
+            )
+
+            print("RAG pipeline initialized successfully!")
+            st.success("API keys validated and RAG pipeline initialized successfully!")
+            st.session_state.api_keys_submitted = True
+
+            print(
+                f"Session state after initialization: api_keys_submitted={st.session_state.api_keys_submitted}, "
+                f"rag_pipeline exists={hasattr(st.session_state, 'rag_pipeline')}"
+            )
+
+        except ValueError as ve:
+            print(f"Validation Error: {str(ve)}")
+            st.error(f"Validation Error: {str(ve)}")
+            st.session_state.api_keys_submitted = False
+
+        except Exception as e:
+            print(f"Error initializing RAG pipeline: {str(e)}")
+            st.error(f"Error initializing RAG pipeline: {str(e)}")
+            st.session_state.api_keys_submitted = False
   
 if "content_summaries" not in st.session_state:
     st.session_state.content_summaries = {}
 
-# Function to process a URL
+if "ingestion_jobs" not in st.session_state:
+    st.session_state.ingestion_jobs = []
+
+if "ingestion_job_urls" not in st.session_state:
+    st.session_state.ingestion_job_urls = {}
+
+# One worker pool per server process, shared by every session
+@st.cache_resource
+def get_ingestion_worker():
+    return IngestionWorker()
+
+# Where ingestion jobs run: the remote service or the local worker pool
+def job_runner():
+    if RAG_SERVICE_URL:
+        return st.session_state.rag_pipeline
+    return get_ingestion_worker()
+
+# Function to submit a URL for background processing
 def process_url(url, mode):
-    with st.spinner(f"Processing {url}..."):
-        num_docs, summary = st.session_state.rag_pipeline.process_website(url, mode=mode)
-        if num_docs > 0:
-            st.session_state.processed_urls.add(url)
-            st.session_state.content_summaries[url] = summary
-            
-            # Add a system message to chat history indicating content is ready
-            ready_message = f"✅ I've processed {url} and extracted {num_docs} documents. I'm now ready to answer your questions about this content!"
-            st.session_state.chat_history.append({"role": "assistant", "content": ready_message})
-            
-            return True, f"Successfully processed {num_docs} documents from {url}"
-        else:
-            return False, f"Failed to process {url}"
+    if RAG_SERVICE_URL:
+        try:
+            job_id = st.session_state.rag_pipeline.submit(url, mode=mode)
+        except requests.RequestException as e:
+            return False, f"Could not reach the RAG service to process {url}: {e}"
+    else:
+        job_id = get_ingestion_worker().submit(st.session_state.rag_pipeline, url, mode=mode)
+    st.session_state.ingestion_jobs.append(job_id)
+    st.session_state.ingestion_job_urls[job_id] = url
+    return True, f"Queued {url} for processing. You can keep asking questions while it runs."
+
+# Function to record a finished ingestion job in the session
+def finish_job(job):
+    url = job["url"]
+    if job["status"] == "completed":
+        st.session_state.processed_urls.add(url)
+        st.session_state.content_summaries[url] = job["summary"]
+
+        # Add a system message to chat history indicating content is ready
+        ready_message = f"✅ I've processed {url} and extracted {job['num_docs']} documents. I'm now ready to answer your questions about this content!"
+        st.session_state.chat_history.append({"role": "assistant", "content": ready_message})
+    elif job["status"] == "cancelled":
+        st.session_state.chat_history.append({"role": "assistant", "content": f"🛑 Processing of {url} was cancelled."})
+    else:
+        st.session_state.chat_history.append(
+            {"role": "assistant", "content": f"❌ Failed to process {url}: {job['error'] or 'unknown error'}"}
+        )
+
+# Live progress for this session's ingestion jobs
+def render_ingestion_jobs():
+    worker = job_runner()
+    finished = False
+    for job_id in list(st.session_state.ingestion_jobs):
+        url = st.session_state.ingestion_job_urls.get(job_id, job_id)
+        try:
+            job = worker.get(job_id)
+        except requests.RequestException as e:
+            st.warning(f"Could not fetch progress for {url}: {e}")
+            continue
+        if job is None:
+            # Unknown to the runner, e.g. the service restarted
+            job = {"url": url, "status": "failed", "error": "the job is no longer known to the ingestion service"}
+        if job["status"] in ("completed", "failed", "cancelled"):
+            finish_job(job)
+            st.session_state.ingestion_jobs.remove(job_id)
+            st.session_state.ingestion_job_urls.pop(job_id, None)
+            finished = True
+            continue
+
+        progress = job["progress"]
+        st.markdown(f"**{job['url']}** — {progress.get('stage', job['status'])}")
+        pages_total = progress.get("pages_total") or "?"
+        st.caption(
+            f"Pages scraped: {progress.get('pages_scraped', 0)}/{pages_total} · "
+            f"Chunks embedded: {progress.get('chunks_embedded', 0)}/{progress.get('chunks_total', '?')} · "
+            f"Batches upserted: {progress.get('batches_upserted', 0)}/{progress.get('batches_total', '?')}"
+        )
+        if progress.get("batches_total"):
+            st.progress(progress.get("batches_upserted", 0) / progress["batches_total"])
+        if st.button("Cancel", key=f"cancel-{job_id}"):
+            try:
+                worker.cancel(job_id)
+            except requests.RequestException as e:
+                st.error(f"Could not cancel {url}: {e}")
+
+    if finished:
+        st.rerun()
+
+# Poll job progress without blocking the rest of the page (Streamlit >= 1.37)
+if hasattr(st, "fragment"):
+    render_ingestion_jobs = st.fragment(run_every=1.0)(render_ingestion_jobs)
 
 # Function to handle user queries
 def handle_query(query):
     if not st.session_state.processed_urls:
         return "Please process at least one URL before asking questions."
     
+    # Restrict retrieval to the selected sources (empty selection = all)
+    sources = st.session_state.get("selected_sources") or None
     with st.spinner("Generating answer..."):
-        answer = st.session_state.rag_pipeline.query(query)
+        answer = st.session_state.rag_pipeline.query(query, sources=sources)
         return answer
 
 # Main app layout
@@ -325,6 +419,11 @@ if st.session_state.api_keys_submitted and "rag_pipeline" in st.session_state:
                     st.error(message)
             else:
                 st.warning("Please enter a URL")
+
+        # Show progress for URLs still being processed
+        if st.session_state.ingestion_jobs:
+            st.subheader("Processing:")
+            render_ingestion_jobs()
         
         # Display processed URLs with expandable summaries
         if st.session_state.processed_urls:
@@ -337,6 +436,13 @@ if st.session_state.api_keys_submitted and "rag_pipeline" in st.session_state:
             </div>
             """, unsafe_allow_html=True)
             
+            st.multiselect(
+                "Answer only from:",
+                sorted(st.session_state.processed_urls),
+                key="selected_sources",
+                help="Leave empty to search all processed content.",
+            )
+
             for url in st.session_state.processed_urls:
                 with st.expander(f"📄 {url}"):
                     if url in st.session_state.content_summaries:
@@ -0,0 +1,59 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from src.processors.embedding_batcher import BatchingEmbeddings
+
+
+class _Model:
+    def __init__(self):
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+
+def test_wait_window_is_measured_from_the_first_query():
+    batcher = BatchingEmbeddings(_Model(), max_wait_ms=50, max_batch_size=100)
+    stop = threading.Event()
+
+    def trickle():
+        # A straggler every 20 ms would keep a per-item timeout open forever
+        while not stop.is_set():
+            batcher._queue.put(object())
+            time.sleep(0.02)
+
+    batcher._queue.put(object())
+    thread = threading.Thread(target=trickle)
+    thread.start()
+    start = time.monotonic()
+    batch = batcher._collect()
+    elapsed = time.monotonic() - start
+    stop.set()
+    thread.join(1)
+
+    assert elapsed < 0.2
+    assert 1 < len(batch) < 100
+
+
+def test_concurrent_queries_share_a_batch():
+    model = _Model()
+    batcher = BatchingEmbeddings(model, max_wait_ms=50)
+    results = {}
+
+    def ask(text):
+        results[text] = batcher.embed_query(text)
+
+    threads = [threading.Thread(target=ask, args=("q" * n,)) for n in range(1, 5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(2)
+
+    assert results == {"q" * n: [float(n)] for n in range(1, 5)}
+    assert sum(len(batch) for batch in model.batches) == 4
+    assert len(model.batches) < 4
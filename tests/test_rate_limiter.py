@@ -0,0 +1,162 @@
+import threading
+import time
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.utils.deadline import Deadline, DeadlineExceeded
+from src.utils.rate_limiter import (
+    BULK,
+    INTERACTIVE,
+    AdaptiveLimiter,
+    limited_call,
+    parse_retry_after,
+    request_priority,
+)
+
+
+class _Throttled(Exception):
+    def __init__(self, status=429, retry_after="0"):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.headers = {"Retry-After": retry_after}
+
+
+def _wait_until(predicate, timeout=2.0):
+    ends_at = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < ends_at, "condition not reached in time"
+        time.sleep(0.001)
+
+
+def _queued(limiter):
+    return sum(limiter.snapshot()["queued"].values())
+
+
+def test_parse_retry_after_seconds():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("0.5") == 0.5
+    assert parse_retry_after("-2") == 0.0
+
+
+def test_parse_retry_after_http_date():
+    when = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25.0 <= parse_retry_after(format_datetime(when, usegmt=True)) <= 30.0
+
+
+@pytest.mark.parametrize("value", [None, "", "soon", "Mon, 99 Foo"])
+def test_parse_retry_after_invalid(value):
+    assert parse_retry_after(value) is None
+
+
+def test_interactive_requests_go_before_bulk():
+    limiter = AdaptiveLimiter("test", max_concurrency=1)
+    order = []
+
+    def request(level, label):
+        with request_priority(level), limiter.acquire():
+            order.append(label)
+
+    with limiter.acquire():
+        bulk = threading.Thread(target=request, args=(BULK, "bulk"))
+        bulk.start()
+        _wait_until(lambda: _queued(limiter) == 1)
+        interactive = threading.Thread(target=request, args=(INTERACTIVE, "interactive"))
+        interactive.start()
+        _wait_until(lambda: _queued(limiter) == 2)
+    bulk.join(2)
+    interactive.join(2)
+
+    assert order == ["interactive", "bulk"]
+
+
+def test_throttle_halves_limit_and_successes_grow_it_back():
+    limiter = AdaptiveLimiter("test", max_concurrency=8)
+
+    with pytest.raises(_Throttled):
+        with limiter.acquire():
+            raise _Throttled(retry_after="0")
+    assert limiter.limit == 4
+
+    # One extra slot per ``limit`` successful requests, capped at the maximum
+    for _ in range(4):
+        with limiter.acquire():
+            pass
+    assert limiter.limit == 5
+    for _ in range(5 + 6 + 7 + 8):
+        with limiter.acquire():
+            pass
+    assert limiter.limit == 8
+
+
+def test_throttle_never_drops_below_min_concurrency():
+    limiter = AdaptiveLimiter("test", max_concurrency=2)
+    for _ in range(3):
+        limiter._on_throttle(0.0)
+    assert limiter.limit == 1
+
+
+def test_observe_reads_status_and_retry_after():
+    class Response:
+        status_code = 503
+        headers = {"Retry-After": "7"}
+
+    limiter = AdaptiveLimiter("test", max_concurrency=4)
+    with limiter.acquire() as slot:
+        assert slot.observe(Response())
+    assert limiter.limit == 2
+    assert 6.0 < limiter.snapshot()["paused_for_s"] <= 7.0
+
+
+def test_acquire_gives_up_at_the_deadline():
+    limiter = AdaptiveLimiter("test", max_concurrency=1)
+    with limiter.acquire():
+        with pytest.raises(DeadlineExceeded):
+            with limiter.acquire(deadline=Deadline(0.05)):
+                pass
+        assert _queued(limiter) == 0
+
+
+def test_limited_call_retries_throttled_attempts():
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise _Throttled(retry_after="0")
+        return "ok"
+
+    assert limited_call("test-retries", flaky, retries=1) == "ok"
+    assert len(attempts) == 2
+
+
+def test_limited_call_does_not_retry_other_errors():
+    attempts = []
+
+    def broken():
+        attempts.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        limited_call("test-errors", broken, retries=3)
+    assert len(attempts) == 1
+
+
+def test_limited_call_retries_errors_matching_retry_on(monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_BACKOFF_S", "0")
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionError("connection reset")
+        return "ok"
+
+    retry_on = lambda error: isinstance(error, ConnectionError)
+    assert limited_call("test-transient", flaky, retries=2, retry_on=retry_on) == "ok"
+    assert len(attempts) == 3
+
+    with pytest.raises(ValueError):
+        limited_call("test-transient", lambda: attempts.append(1) or int("x"), retries=2, retry_on=retry_on)
+    assert len(attempts) == 4
@@ -0,0 +1,67 @@
+import sqlite3
+
+import pytest
+
+pytest.importorskip("requests")
+
+from src.scheduler.recrawl_scheduler import RecrawlScheduler
+
+
+class _Store:
+    def __init__(self, sources, documents):
+        self.sources = sources
+        self.documents = documents
+
+    def list_sources(self):
+        return self.sources
+
+    def list_documents(self, source_id):
+        return self.documents[source_id]
+
+
+class _Pipeline:
+    def __init__(self, store):
+        self.document_store = store
+
+
+def _scheduler(tmp_path, store=None):
+    return RecrawlScheduler(_Pipeline(store or _Store([], {})), db_path=str(tmp_path / "recrawl.sqlite3"))
+
+
+def test_a_page_shared_by_two_sources_is_tracked_for_each(tmp_path):
+    sources = [{"source_id": source_id, "url": url, "mode": "crawl", "last_ingested_at": 1.0}
+               for source_id, url in (("a", "https://x.com"), ("b", "https://x.com/docs"))]
+    page = "https://x.com/docs/intro"
+    store = _Store(sources, {"a": [("doc-a", page, "h1", 1.0)], "b": [("doc-b", page, "h2", 1.0)]})
+    scheduler = _scheduler(tmp_path, store)
+
+    scheduler.sync_sites(now=2.0)
+    scheduler._mark_checked("b", page, 3.0, {"etag": '"v2"'})
+
+    rows = {row["source_id"]: row for row in scheduler._query("SELECT * FROM pages WHERE url = ?", (page,))}
+    assert {source_id: row["doc_id"] for source_id, row in rows.items()} == {"a": "doc-a", "b": "doc-b"}
+    assert rows["a"]["etag"] is None and rows["a"]["check_count"] == 0
+    assert rows["b"]["etag"] == '"v2"' and rows["b"]["check_count"] == 1
+
+
+def test_url_keyed_state_is_upgraded(tmp_path):
+    conn = sqlite3.connect(tmp_path / "recrawl.sqlite3")
+    conn.executescript(
+        """
+        CREATE TABLE pages (url TEXT PRIMARY KEY, source_id TEXT NOT NULL, doc_id TEXT, lastmod REAL,
+            etag TEXT, last_modified TEXT, content_hash TEXT, first_seen_at REAL, last_checked_at REAL,
+            last_changed_at REAL, check_count INTEGER DEFAULT 0, change_count INTEGER DEFAULT 0);
+        CREATE INDEX pages_source ON pages (source_id);
+        CREATE TABLE page_changes (url TEXT NOT NULL, changed_at REAL NOT NULL);
+        INSERT INTO pages (url, source_id, doc_id, check_count, change_count) VALUES ('https://x.com/a', 's', 'd', 4, 1);
+        INSERT INTO page_changes VALUES ('https://x.com/a', 5.0);
+        """
+    )
+    conn.close()
+
+    scheduler = _scheduler(tmp_path)
+
+    page = scheduler._query("SELECT source_id, url, check_count FROM pages")
+    assert [tuple(row) for row in page] == [("s", "https://x.com/a", 4)]
+    changes = scheduler._query("SELECT * FROM page_changes")
+    assert [tuple(row) for row in changes] == [("s", "https://x.com/a", 5.0)]
@@ -0,0 +1,139 @@
+import threading
+import time
+
+import pytest
+
+from src.utils.deadline import DeadlineExceeded
+from src.utils.single_flight import SingleFlight
+
+
+class _Cancelled(Exception):
+    pass
+
+
+@pytest.fixture(autouse=True)
+def _single_flight_enabled(monkeypatch):
+    monkeypatch.delenv("RAG_SINGLE_FLIGHT", raising=False)
+
+
+def _wait_until(predicate, timeout=2.0):
+    ends_at = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < ends_at, "condition not reached in time"
+        time.sleep(0.001)
+
+
+def _follow(group, key, fn, outcomes, **kwargs):
+    def run():
+        try:
+            outcomes.append(("result", group.do(key, fn, **kwargs)))
+        except Exception as e:
+            outcomes.append(("error", e))
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_concurrent_callers_share_one_execution():
+    group = SingleFlight("test")
+    release, executions, outcomes = threading.Event(), [], []
+
+    def fn():
+        executions.append(1)
+        release.wait(2)
+        return 42
+
+    threads = [_follow(group, "key", fn, outcomes) for _ in range(3)]
+    _wait_until(lambda: group.stats()["calls"] == 3)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+
+    assert executions == [1]
+    assert outcomes == [("result", 42)] * 3
+    assert group.stats()["coalesced"] == 2
+
+
+def test_leader_error_reaches_followers():
+    group = SingleFlight("test")
+    release, outcomes = threading.Event(), []
+    error = RuntimeError("upstream down")
+
+    def fn():
+        release.wait(2)
+        raise error
+
+    leader = _follow(group, "key", fn, outcomes)
+    _wait_until(lambda: group.stats()["in_flight"] == 1)
+    follower = _follow(group, "key", fn, outcomes)
+    _wait_until(lambda: group.stats()["calls"] == 2)
+    release.set()
+    leader.join(2)
+    follower.join(2)
+
+    assert outcomes == [("error", error), ("error", error)]
+    assert group.stats()["executions"] == 1
+    assert group.stats()["in_flight"] == 0
+
+
+def test_different_keys_do_not_coalesce():
+    group = SingleFlight("test")
+    assert group.do("a", lambda: 1) == 1
+    assert group.do("b", lambda: 2) == 2
+    assert group.stats()["coalesced"] == 0
+
+
+def test_follower_gives_up_at_its_own_deadline():
+    group = SingleFlight("test")
+    release, outcomes = threading.Event(), []
+
+    leader = _follow(group, "key", lambda: release.wait(2) and "slow", outcomes)
+    _wait_until(lambda: group.stats()["in_flight"] == 1)
+    with pytest.raises(DeadlineExceeded):
+        group.do("key", lambda: "unused", timeout=0.05)
+    release.set()
+    leader.join(2)
+
+    assert outcomes == [("result", "slow")]
+
+
+def test_followers_rerun_after_a_leader_specific_error():
+    group = SingleFlight("test")
+    release, outcomes, runs = threading.Event(), [], []
+    cancelled = _Cancelled()
+
+    def fn():
+        runs.append(1)
+        if len(runs) == 1:
+            release.wait(2)
+            raise cancelled
+        return "fresh"
+
+    leader = _follow(group, "key", fn, outcomes, rerun_on=(_Cancelled,))
+    _wait_until(lambda: group.stats()["in_flight"] == 1)
+    follower = _follow(group, "key", fn, outcomes, rerun_on=(_Cancelled,))
+    _wait_until(lambda: group.stats()["calls"] == 2)
+    release.set()
+    leader.join(2)
+    follower.join(2)
+
+    assert len(runs) == 2
+    assert sorted(outcomes, key=lambda outcome: outcome[0]) == [("error", cancelled), ("result", "fresh")]
+
+
+def test_cancelled_follower_stops_waiting():
+    group = SingleFlight("test")
+    release, outcomes = threading.Event(), []
+    cancel = threading.Event()
+
+    leader = _follow(group, "key", lambda: release.wait(2) and "slow", outcomes)
+    _wait_until(lambda: group.stats()["in_flight"] == 1)
+    cancel.set()
+    assert group.do("key", lambda: "own run", cancel_event=cancel) == "own run"
+    release.set()
+    leader.join(2)
+
+    assert outcomes == [("result", "slow")]
+    assert group.stats()["executions"] == 2
+    assert group.stats()["coalesced"] == 0
@@ -0,0 +1,256 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+from src.database.document_store import DocumentStore
+from src.database.vector_gc import VectorGC
+from src.rag_pipeline import RAGPipeline
+from src.utils.url_utils import source_id_for_url
+
+SITE = "https://x.com"
+INDEX = "test-index"
+
+
+class _Document:
+    def __init__(self, page_content, metadata):
+        self.page_content = page_content
+        self.metadata = metadata
+
+
+class _Splitter:
+    """One chunk per ``|``-separated part of a page."""
+
+    def split_documents(self, documents):
+        return [_Document(part, dict(document.metadata))
+                for document in documents for part in document.page_content.split("|")]
+
+
+class _Scraper:
+    api_key = "firecrawl"
+
+    def __init__(self):
+        self.pages = {}
+
+    def scrape_website(self, url):
+        return [_Document(self.pages[url], {"sourceURL": url})]
+
+    def crawl_website(self, url, progress_callback=None, cancel_event=None):
+        return [_Document(text, {"sourceURL": page}) for page, text in self.pages.items()]
+
+
+class _FakeDB:
+    """In-memory stand-in for ``PineconeDatabase``."""
+
+    index_name = INDEX
+    namespace = "default"
+
+    def __init__(self):
+        self.vectors = {}  # namespace -> {vector_id: metadata}
+        self.filter_deletes = []
+
+    def add_documents(self, vector_store, documents, namespace=None, ids=None):
+        store = self.vectors.setdefault(namespace or self.namespace, {})
+        for vector_id, document in zip(ids, documents):
+            store[vector_id] = dict(document.metadata)
+        return list(ids)
+
+    def delete_vectors(self, ids, namespace=None, batch_size=1000):
+        ids = list(ids)
+        store = self.vectors.get(namespace or self.namespace, {})
+        for vector_id in ids:
+            store.pop(vector_id, None)
+        return len(ids)
+
+    def delete_source_vectors(self, source_id, namespace=None):
+        self.filter_deletes.append(source_id)
+        store = self.vectors.get(namespace or self.namespace, {})
+        for vector_id in [v for v, meta in store.items() if meta.get("source_id") == source_id]:
+            del store[vector_id]
+
+    def list_vector_ids(self, namespace=None, prefix=None):
+        return sorted(v for v in self.vectors.get(namespace or self.namespace, {}) if v.startswith(prefix or ""))
+
+    def fetch_metadata(self, ids, namespace=None):
+        store = self.vectors.get(namespace or self.namespace, {})
+        return {vector_id: store[vector_id] for vector_id in ids if vector_id in store}
+
+    def open_index(self):
+        pass
+
+    def list_namespaces(self, prefix=""):
+        return []
+
+    def ids(self, namespace="default"):
+        return set(self.vectors.get(namespace, {}))
+
+
+@pytest.fixture
+def store(tmp_path):
+    document_store = DocumentStore(path=str(tmp_path / "documents.sqlite3"))
+    yield document_store
+    document_store.close()
+
+
+@pytest.fixture
+def pipeline(store, monkeypatch):
+    monkeypatch.setenv("RAG_CORPUS_ENABLED", "0")
+    monkeypatch.setenv("RAG_GC_ON_INGEST", "1")
+    monkeypatch.delenv("RAG_SOURCE_ROUTING", raising=False)
+    # Only the parts of the pipeline that ingestion touches
+    rag = RAGPipeline.__new__(RAGPipeline)
+    rag.index_name, rag.namespace, rag.source_routing = INDEX, "default", "filter"
+    rag.scraper, rag.db = _Scraper(), _FakeDB()
+    rag._components = {"document_store": store, "text_splitter": _Splitter(), "vector_store": object()}
+    rag._component_locks = {name: threading.Lock() for name in ("vector_gc",)}
+    rag._components["vector_gc"] = VectorGC(rag.db, store)
+    return rag
+
+
+def _ingest(rag, url, mode, source_url=None):
+    return rag._process_website(url, mode, None, None, source_url, summarize=False)[0]
+
+
+def _chunk_ids(rag, page, count, source=SITE):
+    doc_id = DocumentStore.make_doc_id(page, source_id_for_url(source))
+    return {f"{doc_id}:{n}" for n in range(count)}
+
+
+def test_reingest_with_fewer_chunks_deletes_the_extra_ordinals(pipeline):
+    pipeline.scraper.pages = {f"{SITE}/a": "1|2|3", f"{SITE}/b": "1|2"}
+    _ingest(pipeline, SITE, "crawl")
+    pipeline.scraper.pages[f"{SITE}/a"] = "1"
+    _ingest(pipeline, SITE, "crawl")
+
+    assert pipeline.db.ids() == _chunk_ids(pipeline, f"{SITE}/a", 1) | _chunk_ids(pipeline, f"{SITE}/b", 2)
+    assert pipeline.document_store.ledger_stats(INDEX)["reclaimable_vectors"] == 0
+
+
+def test_page_dropped_from_a_crawl_is_removed(pipeline):
+    pipeline.scraper.pages = {f"{SITE}/a": "1|2", f"{SITE}/b": "1|2"}
+    _ingest(pipeline, SITE, "crawl")
+    del pipeline.scraper.pages[f"{SITE}/b"]
+    _ingest(pipeline, SITE, "crawl")
+
+    assert pipeline.db.ids() == _chunk_ids(pipeline, f"{SITE}/a", 2)
+    urls = {url for _, url, _, _ in pipeline.document_store.list_documents(source_id_for_url(SITE))}
+    assert urls == {f"{SITE}/a"}
+
+
+def test_single_page_rescrape_only_touches_that_page(pipeline):
+    pipeline.scraper.pages = {f"{SITE}/a": "1|2|3", f"{SITE}/b": "1|2"}
+    _ingest(pipeline, SITE, "crawl")
+    pipeline.scraper.pages[f"{SITE}/a"] = "1"
+    _ingest(pipeline, f"{SITE}/a", "scrape", source_url=SITE)
+
+    assert pipeline.db.ids() == _chunk_ids(pipeline, f"{SITE}/a", 1) | _chunk_ids(pipeline, f"{SITE}/b", 2)
+
+
+def test_scrape_of_a_crawled_url_keeps_the_crawl(pipeline):
+    pipeline.scraper.pages = {SITE: "1", f"{SITE}/a": "1|2", f"{SITE}/b": "1|2"}
+    _ingest(pipeline, SITE, "crawl")
+    crawled = pipeline.db.ids()
+    _ingest(pipeline, SITE, "scrape")
+
+    assert pipeline.db.ids() == crawled
+    assert pipeline.document_store.get_source(source_id_for_url(SITE))["mode"] == "crawl"
+
+
+def test_expired_source_is_deleted_and_forgotten(pipeline, store):
+    pipeline.scraper.pages = {f"{SITE}/a": "1|2"}
+    _ingest(pipeline, SITE, "crawl")
+    source_id = source_id_for_url(SITE)
+    store.set_source_ttl(source_id, 60)
+    store._conn.execute("UPDATE sources SET last_ingested_at = ?", (time.time() - 120,))
+    store._conn.execute("UPDATE documents SET updated_at = ?", (time.time() - 120,))
+    store._conn.commit()
+
+    result = pipeline.vector_gc.expire_sources()
+
+    assert result["source_ids"] == [source_id]
+    assert pipeline.db.ids() == set()
+    assert store.get_source(source_id) is None
+    assert store.list_documents(source_id) == []
+
+
+def test_expiry_reaches_vectors_written_before_the_ledger(store):
+    db = _FakeDB()
+    source_id = source_id_for_url(SITE)
+    doc_id = "0123456789abcdef"  # an ID from before document IDs were source-scoped
+    store.record_source(source_id, SITE, "scrape", 1)
+    store.put_documents(source_id, [(doc_id, f"{SITE}/", {}, "hash")])
+    store._conn.execute("UPDATE sources SET last_ingested_at = 1")
+    store._conn.execute("UPDATE documents SET updated_at = 1")
+    store._conn.commit()
+    db.vectors["default"] = {f"{doc_id}:0": {"source_id": source_id}, f"{doc_id}:1": {"source_id": source_id},
+                             "uuid-1": {"source_id": source_id}}
+
+    result = VectorGC(db, store, default_ttl=60).expire_sources()
+
+    assert result["vectors_deleted"] == 2
+    assert db.filter_deletes == [source_id]
+    assert db.ids() == set()
+
+
+def test_scan_adopts_current_pages_and_deletes_stale_ones(pipeline, store):
+    source_id = source_id_for_url(SITE)
+    pipeline.scraper.pages = {f"{SITE}/a": "1|2"}
+    _ingest(pipeline, SITE, "crawl")
+    # Written before the ledger: an old-style ID of a page that is still current,
+    # an old-style ID of a page re-ingested since, random IDs and an unknown document
+    store.put_documents(source_id, [("00000000000000aa", f"{SITE}/kept", {}, "h"),
+                                    ("00000000000000bb", f"{SITE}/a", {}, "h")])
+    pipeline.db.vectors["default"].update({
+        "00000000000000aa:0": {}, "00000000000000aa:1": {},
+        "00000000000000bb:0": {},
+        "uuid-stale": {"source_id": source_id, "sourceURL": f"{SITE}/a"},
+        "uuid-unknown": {"sourceURL": f"{SITE}/a"},
+        "ffffffffffffffff:0": {},
+    })
+
+    result = pipeline.vector_gc.scan()
+
+    assert result["vectors_deleted"] == 3
+    assert result["vectors_adopted"] == 2
+    assert result["untracked_vectors_kept"] == 1
+    assert pipeline.db.ids() == (_chunk_ids(pipeline, f"{SITE}/a", 2)
+                                 | {"00000000000000aa:0", "00000000000000aa:1", "uuid-unknown"})
+    assert store.live_chunks(INDEX, "default")["00000000000000aa"] == 2
+
+
+def test_scan_dry_run_changes_nothing(pipeline):
+    pipeline.db.vectors["default"] = {"ffffffffffffffff:0": {}}
+    result = pipeline.vector_gc.scan(dry_run=True)
+
+    assert result["vectors_reclaimable"] == 1
+    assert pipeline.db.ids() == {"ffffffffffffffff:0"}
+
+
+def test_ledger_is_scoped_by_index(store):
+    store.record_chunks("one", "s", "default", {"doc": 3})
+    store.record_chunks("two", "s", "default", {"doc": 1})
+
+    assert store.live_chunks("one", "default") == {"doc": 3}
+    assert store.reclaimable("two") == []
+
+
+def test_unindexed_ledger_is_upgraded(tmp_path, monkeypatch):
+    monkeypatch.setenv("RAG_ACTIVE_INDEX_PATH", str(tmp_path / "missing.json"))
+    monkeypatch.setenv("PINECONE_INDEX_NAME", "legacy")
+    path = tmp_path / "documents.sqlite3"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE chunk_ledger (doc_id TEXT NOT NULL, namespace TEXT NOT NULL,"
+                 " source_id TEXT NOT NULL, live_chunks INTEGER NOT NULL, written_chunks INTEGER NOT NULL,"
+                 " updated_at REAL, PRIMARY KEY (doc_id, namespace))")
+    conn.execute("INSERT INTO chunk_ledger VALUES ('doc', 'default', 's', 1, 3, 0)")
+    conn.commit()
+    conn.close()
+
+    upgraded = DocumentStore(path=str(path))
+    try:
+        assert upgraded.reclaimable("legacy") == [("doc", "default", "s", 1, 3)]
+    finally:
+        upgraded.close()